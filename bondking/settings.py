@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
 import cloudinary
 import cloudinary_storage
@@ -106,6 +107,24 @@ DATABASES = {
     )
 }
 
+# https://docs.djangoproject.com/en/5.2/topics/cache/#database-caching
+# Shared by every worker, so a signal that clears a cached lookup clears it
+# for all of them. The table is created by `manage.py createcachetable`.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "bondking_cache",
+    },
+    # Rendered print PDFs: large values, kept on disk rather than in memory
+    # or the database. Shared by the workers on one instance.
+    "pdf": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(tempfile.gettempdir(), "bondking_pdf_cache"),
+        "TIMEOUT": 60 * 60,
+        "OPTIONS": {"MAX_ENTRIES": 200},
+    },
+}
+
 
 
 
@@ -19,6 +19,7 @@ from .models import (
     ProductID,
     get_user_role,
     is_top_management,
+    user_group_names,
 )
 
 User = get_user_model()
@@ -141,7 +142,7 @@ class DeliveryReceiptForm(forms.ModelForm):
         self.fields["payment_status"].disabled = True
 
         # Top Management and AGR can edit
-        if self.user and self.user.groups.filter(name="AGR").exists():
+        if self.user and "AGR" in user_group_names(self.user):
             self.fields["delivery_status"].disabled = False
             self.fields["payment_status"].disabled = False
 
@@ -348,7 +349,7 @@ class DeliveryReceiptForm(forms.ModelForm):
         if self.user and (
             self.user.is_superuser
             or is_top_management(self.user)
-            or self.user.groups.filter(name="AGR").exists()
+            or "AGR" in user_group_names(self.user)
         ):
             self.fields["delivery_status"].disabled = False
             self.fields["payment_status"].disabled = False
@@ -656,6 +657,9 @@ class InventoryIssuanceItemForm(forms.ModelForm):
         self.is_locked = kwargs.pop("is_locked", False)
         super().__init__(*args, **kwargs)
 
+        # Dropdown only renders "sku - name"
+        self.fields["product"].queryset = Product.objects.only("id", "sku", "name")
+
         if self.is_locked:
             for field in self.fields.values():
                 field.disabled = True
@@ -692,6 +696,9 @@ class BaseInventoryIssuanceItemFormSet(BaseInlineFormSet):
             self.can_delete = False
             self.extra = 0
 
+# inventory_new writes the rows with bulk_create from each form's product
+# and quantity, not formset.save(); keep the item form to those two fields,
+# or anything else it collects is silently dropped on create.
 InventoryIssuanceItemFormSet = inlineformset_factory(
     InventoryIssuance,
     InventoryIssuanceItem,
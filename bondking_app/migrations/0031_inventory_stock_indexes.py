@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-16 13:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bondking_app', '0030_billing_proof_of_payment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryissuance',
+            index=models.Index(condition=models.Q(('is_cancelled', False), ('is_pending', False)), fields=['id'], name='iss_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventoryissuanceitem',
+            index=models.Index(fields=['product', 'issuance'], name='iii_prod_iss_idx'),
+        ),
+    ]
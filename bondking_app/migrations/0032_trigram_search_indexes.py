@@ -0,0 +1,38 @@
+from django.db import migrations
+
+
+# icontains on PostgreSQL compiles to UPPER("col"::text) LIKE UPPER('%x%'),
+# so the trigram indexes are built on that same expression.
+TRGM_INDEXES = (
+    ("dr_number_trgm_idx", "bondking_app_deliveryreceipt", "dr_number"),
+    ("client_company_name_trgm_idx", "bondking_app_client", "company_name"),
+)
+
+
+def create_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    for name, table, column in TRGM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+            f'USING gin ((UPPER("{column}"::text)) gin_trgm_ops);'
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _table, _column in TRGM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name};")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bondking_app', '0031_inventory_stock_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 14:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_paid_to_trgm_index(apps, schema_editor):
+    # Serves paid_to__icontains, i.e. UPPER("paid_to"::text) LIKE ...
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS po_paid_to_trgm_idx ON bondking_app_purchaseorder '
+        'USING gin ((UPPER("paid_to"::text)) gin_trgm_ops);'
+    )
+
+
+def drop_paid_to_trgm_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS po_paid_to_trgm_idx;")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bondking_app', '0032_trigram_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['is_archived', 'is_cancelled', '-date'], name='po_visible_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['prepared_by', '-date'], name='po_prepared_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['product_id_ref', '-date'], name='po_productid_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['status'], name='po_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['approval_status'], name='po_approval_idx'),
+        ),
+        migrations.RunPython(create_paid_to_trgm_index, drop_paid_to_trgm_index),
+    ]
@@ -1,7 +1,7 @@
 from decimal import ROUND_HALF_UP, Decimal
 from django.conf import settings
 from django.core.exceptions import PermissionDenied, ValidationError
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Sum
 from django.utils import timezone
 
@@ -20,10 +20,19 @@ ACCOUNTING_HEAD_GROUP = "AccountingHead"
 TOP_MANAGEMENT_GROUP = "TopManagement"
 
 
-def user_in_group(user, group_name: str) -> bool:
+def user_group_names(user) -> frozenset:
+    # Memoized on the user instance, so guards share one group query per request.
     if not user.is_authenticated:
-        return False
-    return user.groups.filter(name=group_name).exists()
+        return frozenset()
+    names = getattr(user, "_group_names", None)
+    if names is None:
+        names = frozenset(user.groups.values_list("name", flat=True))
+        user._group_names = names
+    return names
+
+
+def user_in_group(user, group_name: str) -> bool:
+    return group_name in user_group_names(user)
 
 
 def is_sales_agent(user):
@@ -51,30 +60,40 @@ def is_accounting_head(user):
 
 
 def is_top_management(user) -> bool:
-    return user.is_superuser or user_in_group(user, TOP_MANAGEMENT_GROUP)
+    # Memoized on the user instance, i.e. once per request for request.user.
+    cached = getattr(user, "_cached_top_mgmt", None)
+    if cached is None:
+        cached = user.is_superuser or user_in_group(user, TOP_MANAGEMENT_GROUP)
+        user._cached_top_mgmt = cached
+    return cached
 
 def get_effective_role(request):
     return request.session.get("simulated_role") or get_user_role(request.user)
 
+# Checked in order; the first matching group wins.
+_ROLE_GROUPS = (
+    (SALES_AGENT_GROUP, "SalesAgent"),
+    (SALES_HEAD_GROUP, "SalesHead"),
+    (LOGISTICS_OFFICER_GROUP, "LogisticsOfficer"),
+    (LOGISTICS_HEAD_GROUP, "LogisticsHead"),
+    (ACCOUNTING_OFFICER_GROUP, "AccountingOfficer"),
+    (ACCOUNTING_HEAD_GROUP, "AccountingHead"),
+    (TOP_MANAGEMENT_GROUP, "TopManagement"),
+)
+
 def get_user_role(user) -> str | None:
     """
     Map a Django user to a logical role string based on their groups.
+
+    Memoized on the user instance as ``_cached_role``, so the groups are
+    read at most once per request.
     """
-    if user_in_group(user, SALES_AGENT_GROUP):
-        return "SalesAgent"
-    if user_in_group(user, SALES_HEAD_GROUP):
-        return "SalesHead"
-    if user_in_group(user, LOGISTICS_OFFICER_GROUP):
-        return "LogisticsOfficer"
-    if user_in_group(user, LOGISTICS_HEAD_GROUP):
-        return "LogisticsHead"
-    if user_in_group(user, ACCOUNTING_OFFICER_GROUP):
-        return "AccountingOfficer"
-    if user_in_group(user, ACCOUNTING_HEAD_GROUP):
-        return "AccountingHead"
-    if user_in_group(user, TOP_MANAGEMENT_GROUP):
-        return "TopManagement"
-    return None
+    if hasattr(user, "_cached_role"):
+        return user._cached_role
+    names = user_group_names(user)
+    role = next((r for g, r in _ROLE_GROUPS if g in names), None)
+    user._cached_role = role
+    return role
 
 # Inventory Issuance permissions (EXTENSIBLE)
 INVENTORY_ISSUANCE_EDIT_ROLES = {"AGR"}
@@ -230,18 +249,24 @@ class Client(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Address parts, in display order
+    ADDRESS_FIELDS = (
+        "unit_room",
+        "street_number",
+        "street_name",
+        "barangay",
+        "city_municipality",
+        "province_state",
+        "postal_code",
+    )
+
+    @staticmethod
+    def format_address(parts):
+        return ", ".join(filter(None, parts))
+
     @property
     def full_address(self):
-        parts = [
-            self.unit_room,
-            self.street_number,
-            self.street_name,
-            self.barangay,
-            self.city_municipality,
-            self.province_state,
-            self.postal_code,
-        ]
-        return ", ".join(filter(None, parts))
+        return self.format_address(getattr(self, f) for f in self.ADDRESS_FIELDS)
 
 
     def __str__(self):
@@ -423,6 +448,14 @@ DR_STEP_META = {
     },
 }
 
+# Every step carries all four role sets as frozensets, so callers can index
+# them directly; EMPTY_ROLES is the default for steps outside the DR flow.
+EMPTY_ROLES = frozenset()
+DR_ROLE_KEYS = ("forward_roles", "backward_roles", "approver_roles", "decliner_roles")
+for _meta in DR_STEP_META.values():
+    for _key in DR_ROLE_KEYS:
+        _meta[_key] = frozenset(_meta.get(_key, EMPTY_ROLES))
+
 
 class DeliveryReceipt(models.Model):
     """
@@ -572,10 +605,21 @@ class DeliveryReceipt(models.Model):
         if save:
             self.save(update_fields=["total_amount"])
 
-    def log_update(self, user, message: str, user_notes: str = ""):
+    def log_update(self, user, message: str | list[str], user_notes: str = ""):
         """
         Central logging helper, used by all state-changing operations.
+        Pass a list of messages to write them in a single INSERT.
         """
+        if isinstance(message, (list, tuple)):
+            return DeliveryReceiptUpdate.objects.bulk_create([
+                DeliveryReceiptUpdate(
+                    delivery_receipt=self,
+                    user=user,
+                    system_update=m,
+                    user_notes=user_notes or "",
+                )
+                for m in message
+            ])
         return DeliveryReceiptUpdate.objects.create(
             delivery_receipt=self,
             user=user,
@@ -660,6 +704,36 @@ class DeliveryReceipt(models.Model):
         # Fallback
         return "NEW_DR"
 
+    @staticmethod
+    def current_column_expression():
+        """
+        SQL equivalent of get_current_column(), for annotating querysets
+        (e.g. ``.annotate(_current_column=...)``) instead of mapping per row.
+        """
+        return models.Case(
+            models.When(delivery_status=DeliveryStatus.NEW_DR, then=models.Value("NEW_DR")),
+            models.When(delivery_status=DeliveryStatus.FOR_DELIVERY, then=models.Value("FOR_DELIVERY")),
+            models.When(
+                delivery_status=DeliveryStatus.DELIVERED,
+                payment_status=PaymentStatus.NA,
+                then=models.Value("DELIVERED"),
+            ),
+            models.When(
+                payment_status__in=[
+                    PaymentStatus.FOR_COUNTER_CREATION,
+                    PaymentStatus.FOR_COUNTERING,
+                    PaymentStatus.COUNTERED,
+                    PaymentStatus.FOR_COLLECTION,
+                    PaymentStatus.FOR_DEPOSIT,
+                    PaymentStatus.DEPOSITED,
+                ],
+                then=models.F("payment_status"),
+            ),
+            default=models.Value("NEW_DR"),
+            output_field=models.CharField(),
+        )
+
+    @transaction.atomic
     def move_to_column(
         self,
         user,
@@ -710,7 +784,7 @@ class DeliveryReceipt(models.Model):
         # 1. Role permissions (meta-driven)
         # -------------------------------
         curr_meta = DR_STEP_META.get(current_column, {})
-        allowed_roles = curr_meta.get("forward_roles", set()) if is_forward else curr_meta.get("backward_roles", set())
+        allowed_roles = curr_meta.get("forward_roles" if is_forward else "backward_roles", EMPTY_ROLES)
 
         # Door-to-Door: Sales can move forward from DELIVERED (after approval) - preserve your existing rule
         if self.delivery_method == DeliveryMethod.DOOR_TO_DOOR and current_column == "DELIVERED" and is_forward:
@@ -740,7 +814,7 @@ class DeliveryReceipt(models.Model):
                 self.delivery_status = DeliveryStatus.DELIVERED
                 self.payment_status = PaymentStatus.NA
                 self.approval_status = ApprovalStatus.PENDING
-                self.save(update_fields=["delivery_status", "payment_status", "approval_status"])
+                self.save(update_fields=["delivery_status", "payment_status", "approval_status", "updated_at"])
 
                 msg = f"Door-to-Door moved from NEW_DR to DELIVERED by {actor_role}."
                 if user_notes:
@@ -783,7 +857,7 @@ class DeliveryReceipt(models.Model):
                 self.delivery_status = DeliveryStatus.NEW_DR
                 self.payment_status = PaymentStatus.NA
                 self.approval_status = ApprovalStatus.PENDING
-                self.save(update_fields=["delivery_status", "payment_status", "approval_status"])
+                self.save(update_fields=["delivery_status", "payment_status", "approval_status", "updated_at"])
 
                 msg = f"Door-to-Door reverted from DELIVERED to NEW DR by {actor_role}."
                 if user_notes:
@@ -843,7 +917,8 @@ class DeliveryReceipt(models.Model):
             if is_backward:
                 # your old code doesn’t force approval_status here except special cases above
                 pass
-        self.save()
+        # A move only ever changes the status columns
+        self.save(update_fields=["delivery_status", "payment_status", "approval_status", "updated_at"])
 
         # -------------------------------
         # 6. Logging (preserve)
@@ -854,6 +929,7 @@ class DeliveryReceipt(models.Model):
         self.log_update(user=user, message=msg, user_notes=user_notes)
 
     # ====== Approval / Decline ======
+    @transaction.atomic
     def approve_current_step(self, user, user_notes: str = "", simulated_role: str | None = None):
         if simulated_role and is_top_management(user):
             actor_role = simulated_role
@@ -868,7 +944,7 @@ class DeliveryReceipt(models.Model):
 
         column = self.get_current_column()
         meta = DR_STEP_META.get(column, {})
-        allowed = set(meta.get("approver_roles", set()))
+        allowed = meta.get("approver_roles", EMPTY_ROLES)
 
         if actor_role not in allowed:
             raise PermissionDenied(f"Role {actor_role} is not allowed to approve in {column}.")
@@ -881,6 +957,7 @@ class DeliveryReceipt(models.Model):
             msg += f" Notes: {user_notes}"
         self.log_update(user=user, message=msg, user_notes=user_notes)
 
+    @transaction.atomic
     def decline_current_step(self, user, user_notes: str = "", simulated_role: str | None = None):
         if simulated_role and is_top_management(user):
             actor_role = simulated_role
@@ -896,7 +973,7 @@ class DeliveryReceipt(models.Model):
         current_column = self.get_current_column()
 
         meta = DR_STEP_META.get(current_column, {})
-        allowed = set(meta.get("decliner_roles", set()))
+        allowed = meta.get("decliner_roles", EMPTY_ROLES)
 
         if actor_role not in allowed:
             raise PermissionDenied(f"Role {actor_role} is not allowed to decline in {current_column}.")
@@ -1234,6 +1311,16 @@ class InventoryIssuance(models.Model):
     remarks = models.TextField(blank=True)
     date = models.DateField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Stock aggregates only count approved, non-cancelled issuances
+            models.Index(
+                fields=["id"],
+                name="iss_active_idx",
+                condition=models.Q(is_pending=False, is_cancelled=False),
+            ),
+        ]
+
     def __str__(self):
         return f"ISS-{self.id}"
 
@@ -1246,6 +1333,11 @@ class InventoryIssuanceItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "issuance"], name="iii_prod_iss_idx"),
+        ]
+
 
 class DeliveryReceiptUpdate(models.Model):
     delivery_receipt = models.ForeignKey(
@@ -1396,6 +1488,14 @@ class PurchaseOrder(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # po_table's visibility filter, newest first
+            models.Index(fields=["is_archived", "is_cancelled", "-date"], name="po_visible_date_idx"),
+            models.Index(fields=["prepared_by", "-date"], name="po_prepared_date_idx"),
+            models.Index(fields=["product_id_ref", "-date"], name="po_productid_date_idx"),
+            models.Index(fields=["status"], name="po_status_idx"),
+            models.Index(fields=["approval_status"], name="po_approval_idx"),
+        ]
 
     def __str__(self):
         return f"PO #{self.id} - {self.paid_to}"
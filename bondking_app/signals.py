@@ -0,0 +1,58 @@
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (
+    Client,
+    DeliveryReceipt,
+    DeliveryReceiptItem,
+    InventoryIssuance,
+    InventoryIssuanceItem,
+    ProductID,
+    User,
+)
+
+# Cached {id, company_name} rows for the DR client picker
+CLIENT_CHOICES_CACHE_KEY = "dr_clients_ordered"
+# Cached company/agent/city filter suggestions for the client table
+CLIENT_TABLE_SUGGESTIONS_CACHE_KEY = "client_table:suggestions"
+# Cached per-product movement totals behind the inventory stock figures
+STOCK_TOTALS_CACHE_KEY = "inventory:stock_totals"
+# Cached active {id, code} rows for the PO table Product ID filter
+PRODUCT_ID_CHOICES_CACHE_KEY = "po_table:product_ids"
+
+
+@receiver([post_save, post_delete], sender=Client)
+def invalidate_client_choices(sender, **kwargs):
+    cache.delete_many([CLIENT_CHOICES_CACHE_KEY, CLIENT_TABLE_SUGGESTIONS_CACHE_KEY])
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_agent_suggestions(sender, update_fields=None, **kwargs):
+    # Logins only touch last_login, which the suggestions don't show
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    cache.delete(CLIENT_TABLE_SUGGESTIONS_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=DeliveryReceipt)
+@receiver([post_save, post_delete], sender=DeliveryReceiptItem)
+@receiver([post_save, post_delete], sender=InventoryIssuance)
+@receiver([post_save, post_delete], sender=InventoryIssuanceItem)
+def invalidate_stock_totals(sender, **kwargs):
+    cache.delete(STOCK_TOTALS_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=ProductID)
+def invalidate_product_id_choices(sender, **kwargs):
+    cache.delete(PRODUCT_ID_CHOICES_CACHE_KEY)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def reset_user_group_memos(sender, instance, action, reverse, **kwargs):
+    # Forward edits (user.groups.*) leave stale per-request memos on the user
+    if reverse or action not in ("post_add", "post_remove", "post_clear"):
+        return
+    instance.__dict__.pop("_group_names", None)
+    instance.__dict__.pop("_cached_role", None)
+    instance.__dict__.pop("_cached_top_mgmt", None)
@@ -1,9 +1,11 @@
 from django import template
 
+from ..models import user_group_names
+
 register = template.Library()
 
 @register.filter(name="has_group")
 def has_group(user, group_name):
     if not user or not user.is_authenticated:
         return False
-    return user.groups.filter(name=group_name).exists()
+    return group_name in user_group_names(user)
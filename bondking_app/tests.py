@@ -1,3 +1,435 @@
-from django.test import TestCase
+import io
+import tempfile
+from collections import Counter
+from datetime import date, datetime
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models.signals import post_save
+from django.http import QueryDict
+from django.utils import timezone
+from openpyxl import load_workbook
+from django.test import TestCase, override_settings
+
+from .models import (
+    Client,
+    DeliveryReceipt,
+    DeliveryReceiptItem,
+    DeliveryStatus,
+    InventoryIssuance,
+    InventoryIssuanceItem,
+    PaymentStatus,
+    Product,
+    ProductID,
+    PurchaseOrder,
+    User,
+)
+from .views import (
+    dr_table_filter,
+    get_client_choices,
+    get_product_id_choices,
+    kanban_column_counts,
+    keyset_order,
+    seek_page,
+    warehouse_stock_map,
+)
+
+
+# Templates render {% static %} without a collectstatic manifest
+TEST_STORAGES = {
+    **settings.STORAGES,
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+@override_settings(STORAGES=TEST_STORAGES)
+class BondkingTestCase(TestCase):
+    """
+    Superuser, agent and client shared by the view tests.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        cls.admin.groups.add(Group.objects.create(name="TopManagement"))
+        cls.agent = User.objects.create_user("agent", password="pw")
+        cls.client_obj = Client.objects.create(company_name="Acme", agent=cls.agent)
+
+    @classmethod
+    def make_dr(cls, **fields):
+        fields.setdefault("client", cls.client_obj)
+        fields.setdefault("agent", cls.agent)
+        fields.setdefault("created_by", cls.admin)
+        fields.setdefault("payment_method", "CASH")
+        fields.setdefault("date_of_order", date(2025, 1, 1))
+        return DeliveryReceipt.objects.create(**fields)
+
+    def setUp(self):
+        # Cached lookups must not leak between tests
+        cache.clear()
+        self.client.force_login(self.admin)
+
+
+class DRTableNavigationTests(BondkingTestCase):
+    """
+    dr_edit's prev/next (from the table) walks rows in the table's order.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Two same-date groups, so the id tie-break decides the order
+        for day in (1, 1, 1, 2, 2, 2, 3):
+            cls.make_dr(date_of_order=date(2025, 1, day), total_amount=10)
+
+    def table_ids(self, sort_by):
+        response = self.client.get("/dr/table/", {"sort_by": sort_by})
+        return [dr.pk for dr in response.context["page_obj"]]
+
+    def nav(self, pk, sort_by):
+        response = self.client.get(f"/dr/{pk}/edit/", {"from": "table", "sort_by": sort_by})
+        prev_dr, next_dr = response.context["prev_dr"], response.context["next_dr"]
+        return (prev_dr and prev_dr.pk, next_dr and next_dr.pk)
+
+    def test_prev_next_follow_table_order(self):
+        for sort_by in ("date_desc", "date_asc", "total_desc", "total_asc"):
+            ids = self.table_ids(sort_by)
+            self.assertEqual(len(ids), 7)
+            for i, pk in enumerate(ids):
+                expected = (ids[i - 1] if i else None, ids[i + 1] if i < len(ids) - 1 else None)
+                with self.subTest(sort_by=sort_by, pk=pk):
+                    self.assertEqual(self.nav(pk, sort_by), expected)
+
+
+class DRTablePaginationTests(BondkingTestCase):
+    """
+    dr_table's count and pages reflect DRs created since the last load.
+    """
+
+    def test_new_drs_are_counted_and_reachable(self):
+        for _ in range(90):
+            self.make_dr()
+        response = self.client.get("/dr/table/")
+        self.assertEqual(response.context["page_obj"].paginator.count, 90)
+
+        for _ in range(40):
+            self.make_dr()
+        response = self.client.get("/dr/table/", {"page": 2})
+        page_obj = response.context["page_obj"]
+        self.assertEqual(page_obj.paginator.count, 130)
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual(len(page_obj), 30)
+
+
+class POTableTests(BondkingTestCase):
+    """
+    po_table row rendering.
+    """
+
+    def test_product_id_cell(self):
+        code = ProductID.objects.create(code="PID-7")
+        with_code = PurchaseOrder.objects.create(paid_to="Supplier A", prepared_by=self.admin, product_id_ref=code)
+        without = PurchaseOrder.objects.create(paid_to="Supplier B", prepared_by=self.admin)
+
+        response = self.client.get("/po/table/")
+        rows = {po.pk: po for po in response.context["page_obj"]}
+        self.assertEqual(rows[with_code.pk].product_code, "PID-7")
+        self.assertIsNone(rows[without.pk].product_code)
+        self.assertContains(response, "<td>PID-7</td>", html=True)
+        self.assertNotContains(response, "<td>None</td>", html=True)
+
+
+class MoveDRTests(BondkingTestCase):
+    """
+    move_dr's JSON errors and column counts.
+    """
+
+    def test_permission_error_keeps_model_reason(self):
+        dr = self.make_dr(delivery_method="DELIVERY")
+        nobody = User.objects.create_user("nobody", password="pw")
+        self.client.force_login(nobody)
+
+        response = self.client.post(f"/dr/{dr.pk}/move/", {"target_column": "FOR_DELIVERY"})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()["error"], "Your account does not have an assigned role.")
+
+    def test_counts_match_a_fresh_recount(self):
+        dr = self.make_dr(delivery_method="DELIVERY")
+        self.make_dr(delivery_method="DELIVERY")
+
+        response = self.client.post(f"/dr/{dr.pk}/move/", {"target_column": "FOR_DELIVERY"})
+        body = response.json()
+        self.assertTrue(body["ok"], body)
+        self.assertEqual(body["counts"], kanban_column_counts())
+
+
+class CachedLookupTests(BondkingTestCase):
+    """
+    Cached lookups are dropped by the save signals of the rows they hold.
+    """
+
+    def test_client_choices_follow_new_clients(self):
+        self.assertEqual([c["company_name"] for c in get_client_choices()], ["Acme"])
+        Client.objects.create(company_name="Beta", agent=self.agent)
+        self.assertEqual([c["company_name"] for c in get_client_choices()], ["Acme", "Beta"])
+
+    def test_product_id_choices_follow_saves(self):
+        self.assertEqual(get_product_id_choices(), [])
+        pid = ProductID.objects.create(code="PID-1")
+        self.assertEqual(get_product_id_choices(), [{"id": pid.pk, "code": "PID-1"}])
+
+
+class PrintPDFCacheTests(BondkingTestCase):
+    """
+    Print PDFs come from the "pdf" cache until the printed HTML changes.
+    """
+
+    def setUp(self):
+        super().setUp()
+        pdf_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(pdf_dir.cleanup)
+        caches_setting = {
+            **settings.CACHES,
+            "pdf": {**settings.CACHES["pdf"], "LOCATION": pdf_dir.name},
+        }
+        override = override_settings(CACHES=caches_setting)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        patcher = mock.patch("bondking_app.views.pdfkit")
+        self.pdfkit = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pdfkit.from_string.side_effect = lambda html, *args, **kwargs: b"%PDF-" + html.encode()[:20]
+
+    def test_dr_print_is_rendered_once_per_version(self):
+        dr = self.make_dr()
+        for _ in range(2):
+            response = self.client.get(f"/dr/{dr.pk}/print/")
+            self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(self.pdfkit.from_string.call_count, 1)
+
+        DeliveryReceipt.objects.filter(pk=dr.pk).update(remarks="Changed for print")
+        self.client.get(f"/dr/{dr.pk}/print/")
+        self.assertEqual(self.pdfkit.from_string.call_count, 2)
+
+
+class InventoryMovementRowsTests(BondkingTestCase):
+    """
+    inventory_table's UNION ALL paging matches a plain day sort of all
+    movements: same-day rows keep issuances first, then id order, and DRs
+    without a delivery date count as the earliest day.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        product = Product.objects.create(sku="S1", name="Widget", unit="pcs", default_unit_price=10)
+        cls.expected = []  # (day, source, qty); every quantity is unique
+        qty = 0
+
+        days = [date(2025, 3, 1), date(2025, 3, 2), date(2025, 3, 2), date(2025, 3, 4)]
+        for i in range(60):
+            qty += 1
+            day = days[i % len(days)]
+            issuance = InventoryIssuance.objects.create(
+                issuance_type=InventoryIssuance.TF_TO_WH, is_pending=False, created_by=cls.admin
+            )
+            InventoryIssuance.objects.filter(pk=issuance.pk).update(
+                created_at=timezone.make_aware(datetime(day.year, day.month, day.day, 23 - i % 20))
+            )
+            InventoryIssuanceItem.objects.create(issuance=issuance, product=product, quantity=qty)
+            cls.expected.append((day, 0, qty))
+
+        for i in range(60):
+            qty += 1
+            day = [date(2025, 3, 2), None, date(2025, 3, 3)][i % 3]
+            dr = cls.make_dr(delivery_method="DELIVERY")
+            DeliveryReceipt.objects.filter(pk=dr.pk).update(
+                delivery_status=DeliveryStatus.DELIVERED, date_of_delivery=day
+            )
+            DeliveryReceiptItem.objects.create(delivery_receipt=dr, product=product, quantity=qty, unit_price=1)
+            cls.expected.append((day or date.min, 1, qty))
+
+    def expected_qtys(self, descending):
+        # Quantities were assigned in id order, so qty doubles as the id tie-break
+        if descending:
+            key = lambda r: (-r[0].toordinal(), r[1], r[2])
+        else:
+            key = lambda r: r
+        return [qty for _, _, qty in sorted(self.expected, key=key)]
+
+    def test_pages_and_export_follow_day_order(self):
+        for sort_by, descending in (("date_desc", True), ("date_asc", False)):
+            params = {"sort_by": sort_by, "hide_cancelled": "1"}
+            with self.subTest(sort_by=sort_by):
+                qtys, page = [], 1
+                while True:
+                    response = self.client.get("/inventory/table/", {**params, "page": page})
+                    page_obj = response.context["page_obj"]
+                    self.assertEqual(page_obj.paginator.count, 120)
+                    qtys += [row["qty"] for row in page_obj]
+                    if not page_obj.has_next():
+                        break
+                    page += 1
+                self.assertEqual(page, 2)
+                self.assertEqual(qtys, self.expected_qtys(descending))
+
+                response = self.client.get("/inventory/table/", {**params, "export": "1"})
+                sheet = load_workbook(io.BytesIO(response.content)).worksheets[0]
+                exported = [row[4] for row in sheet.iter_rows(min_row=2, values_only=True)]
+                self.assertEqual(exported, self.expected_qtys(descending))
+
+    def test_date_range_filters_both_sources(self):
+        response = self.client.get(
+            "/inventory/table/",
+            {"hide_cancelled": "1", "start_date": "2025-03-02", "end_date": "2025-03-03"},
+        )
+        rows = list(response.context["page_obj"])
+        expected = [r for r in self.expected if date(2025, 3, 2) <= r[0] <= date(2025, 3, 3)]
+        self.assertEqual(sorted(row["qty"] for row in rows), sorted(qty for _, _, qty in expected))
+
+
+class DRTableFilterTests(BondkingTestCase):
+    """
+    dr_table_filter() builds the DR table filters from GET params.
+    """
+
+    def filtered(self, query):
+        return set(
+            DeliveryReceipt.objects.filter(dr_table_filter(QueryDict(query)))
+            .values_list("pk", flat=True)
+        )
+
+    def test_filters(self):
+        other_client = Client.objects.create(company_name="Beta Trading", agent=self.agent)
+        jan = self.make_dr(date_of_order=date(2025, 1, 5))
+        feb = self.make_dr(date_of_order=date(2025, 2, 5), client=other_client, payment_method="CHECK")
+        archived = self.make_dr(date_of_order=date(2025, 2, 6))
+        DeliveryReceipt.objects.filter(pk=archived.pk).update(is_archived=True)
+        invoiced = self.make_dr(date_of_order=date(2025, 3, 1))
+        DeliveryReceipt.objects.filter(pk=invoiced.pk).update(sales_invoice_no="SI-1")
+        everything = {jan.pk, feb.pk, archived.pk, invoiced.pk}
+
+        self.assertEqual(self.filtered(""), everything)
+        self.assertEqual(self.filtered("start_date=2025-02-01&end_date=2025-02-28"), {feb.pk, archived.pk})
+        self.assertEqual(self.filtered("hide_archived=1"), everything - {archived.pk})
+        self.assertEqual(self.filtered("payment_method=CHECK"), {feb.pk})
+        self.assertEqual(self.filtered("client_name=beta"), {feb.pk})
+        self.assertEqual(self.filtered("client_name=beta&client_name=acme"), everything)
+        self.assertEqual(self.filtered("q=beta"), {feb.pk})
+        self.assertEqual(self.filtered(f"client={other_client.pk}"), {feb.pk})
+        self.assertEqual(self.filtered("with_sales_invoice=1"), {invoiced.pk})
+        self.assertEqual(self.filtered(f"dr_number={feb.dr_number}"), {feb.pk})
+
+
+class SeekPageTests(BondkingTestCase):
+    """
+    seek_page() returns the same rows as the OFFSET page it replaces.
+    """
+
+    def test_seek_matches_offset_pages(self):
+        for day in (1, 1, 1, 2, 2, 3, 3, 3, 3, 4, 5):
+            self.make_dr(date_of_order=date(2025, 1, day))
+
+        for sort_field in ("-date_of_order", "date_of_order"):
+            qs = DeliveryReceipt.objects.order_by(*keyset_order(sort_field))
+            paginator = Paginator(qs, 3)
+            after = None
+            for number in paginator.page_range:
+                with self.subTest(sort_field=sort_field, page=number):
+                    page = seek_page(paginator, number, after, sort_field)
+                    offset_page = paginator.page(number)
+                    self.assertEqual([dr.pk for dr in page], [dr.pk for dr in offset_page])
+                    self.assertEqual(page.has_next(), offset_page.has_next())
+                after = page[len(page) - 1].pk
+
+    def test_unusable_after_falls_back_to_offset(self):
+        for day in range(1, 6):
+            self.make_dr(date_of_order=date(2025, 1, day))
+        paginator = Paginator(DeliveryReceipt.objects.order_by(*keyset_order("date_of_order")), 2)
+        for after in (None, "x", "999999"):
+            page = seek_page(paginator, 2, after, "date_of_order")
+            self.assertEqual([dr.pk for dr in page], [dr.pk for dr in paginator.page(2)])
+
+
+class KanbanColumnCountTests(BondkingTestCase):
+    """
+    kanban_column_counts() agrees with DeliveryReceipt.get_current_column().
+    """
+
+    def test_counts_match_current_column(self):
+        combos = [
+            (DeliveryStatus.NEW_DR, PaymentStatus.NA),
+            (DeliveryStatus.FOR_DELIVERY, PaymentStatus.NA),
+            (DeliveryStatus.DELIVERED, PaymentStatus.NA),
+        ] + [(DeliveryStatus.DELIVERED, status) for status, _ in PaymentStatus.choices]
+        for delivery_status, payment_status in combos:
+            dr = self.make_dr()
+            DeliveryReceipt.objects.filter(pk=dr.pk).update(
+                delivery_status=delivery_status, payment_status=payment_status
+            )
+
+        expected = Counter(dr.get_current_column() for dr in DeliveryReceipt.objects.all())
+        counts = kanban_column_counts()
+        self.assertEqual({k: v for k, v in counts.items() if v}, dict(expected))
+
+
+class InventoryNewTests(BondkingTestCase):
+    """
+    inventory_new's WH_TO_HQ stock check and item writes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = Product.objects.create(sku="S1", name="Widget", unit="pcs", default_unit_price=10)
+        stocked = InventoryIssuance.objects.create(
+            issuance_type=InventoryIssuance.TF_TO_WH, is_pending=False, created_by=cls.admin
+        )
+        InventoryIssuanceItem.objects.create(issuance=stocked, product=cls.product, quantity=10)
+
+    def post(self, issuance_type, *quantities):
+        data = {
+            "issuance_type": issuance_type,
+            "date": "2025-03-01",
+            "items-TOTAL_FORMS": len(quantities),
+            "items-INITIAL_FORMS": 0,
+            "items-MIN_NUM_FORMS": 0,
+            "items-MAX_NUM_FORMS": 1000,
+        }
+        for i, qty in enumerate(quantities):
+            data[f"items-{i}-product"] = self.product.pk
+            data[f"items-{i}-quantity"] = qty
+        return self.client.post("/inventory/new/", data)
+
+    def test_shortfall_is_rejected(self):
+        response = self.post(InventoryIssuance.WH_TO_HQ, 12)
+        self.assertRedirects(response, "/inventory/new/", fetch_redirect_response=False)
+        self.assertEqual(InventoryIssuance.objects.count(), 1)
+
+    def test_split_rows_are_checked_together(self):
+        response = self.post(InventoryIssuance.WH_TO_HQ, 6, 6)
+        self.assertRedirects(response, "/inventory/new/", fetch_redirect_response=False)
+        self.assertEqual(InventoryIssuance.objects.count(), 1)
+        self.assertEqual(InventoryIssuanceItem.objects.count(), 1)
+
+    def test_valid_issuance_saves_items_and_runs_receivers(self):
+        self.assertEqual(warehouse_stock_map()[self.product.pk], 10)  # primes the cache
+        saved = []
+
+        def record(sender, instance, created, **kwargs):
+            saved.append((instance.pk, created))
+
+        post_save.connect(record, sender=InventoryIssuanceItem)
+        self.addCleanup(post_save.disconnect, record, sender=InventoryIssuanceItem)
+
+        response = self.post(InventoryIssuance.WH_TO_HQ, 6, 4)
+        self.assertRedirects(response, "/inventory/table/", fetch_redirect_response=False)
+        issuance = InventoryIssuance.objects.latest("pk")
+        items = list(issuance.items.order_by("pk").values_list("pk", "quantity"))
+        self.assertEqual([qty for _, qty in items], [6, 4])
+        self.assertEqual(saved, [(pk, True) for pk, _ in items])
+        self.assertEqual(warehouse_stock_map()[self.product.pk], 0)
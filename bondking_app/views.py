@@ -1,21 +1,31 @@
+from collections import defaultdict
 from datetime import date, timedelta, datetime
+from functools import lru_cache
+from itertools import islice
 from django.utils import timezone
+import hashlib
+import logging
 import os
 import traceback
+from types import MappingProxyType
 from urllib import request
+from urllib.parse import urlencode
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import ValidationError, PermissionDenied
-from django.http import HttpResponseForbidden, JsonResponse,HttpResponse, QueryDict
+from django.http import Http404, HttpResponseForbidden, JsonResponse,HttpResponse, QueryDict
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.views.decorators.http import require_POST, require_GET
 from django.contrib.auth import get_user_model
-from django.db.models import Prefetch, Sum, Q
-from django.core.paginator import Paginator
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Prefetch, Sum, Q, Value, When
+from django.db.models.functions import TruncDate
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
 import openpyxl
 from openpyxl import Workbook
 from django.contrib import messages
+from django.core.cache import cache, caches
 from django.db import transaction
+from django.db.models.signals import post_save
 import pdfkit
 from django.template.loader import get_template,render_to_string
 from django.templatetags.static import static
@@ -24,6 +34,7 @@ from bondking import settings
 
 from .models import (
     DR_STEP_META,
+    EMPTY_ROLES,
     PO_FLOW,
     PO_META,
     ApprovalStatus,
@@ -47,6 +58,7 @@ from .models import (
     get_effective_role,
     get_user_role,
     is_top_management,
+    user_group_names,
     PurchaseOrder,
     InventoryIssuance,
     InventoryIssuanceItem,
@@ -63,13 +75,79 @@ from .forms import (
     PurchaseOrderForm,
     PurchaseOrderParticularFormSet,
 )
+from .signals import (
+    CLIENT_CHOICES_CACHE_KEY,
+    CLIENT_TABLE_SUGGESTIONS_CACHE_KEY,
+    PRODUCT_ID_CHOICES_CACHE_KEY,
+    STOCK_TOTALS_CACHE_KEY,
+)
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
 
 
 # =========================
 #  API HELPERS (CLIENT / PRODUCT)
 # =========================
+def get_client_choices():
+    """
+    Ordered client rows for the DR client picker. Cached; the key is cleared
+    whenever a Client is saved or deleted.
+    """
+    return cache.get_or_set(
+        CLIENT_CHOICES_CACHE_KEY,
+        lambda: list(Client.objects.order_by("company_name").values("id", "company_name")),
+        300,
+    )
+
+
+def get_client_table_suggestions():
+    """
+    Company / agent / city suggestion lists for the client table filters.
+    Cached; cleared whenever a Client or User is saved or deleted.
+    """
+    def build():
+        return {
+            "companies": list(
+                Client.objects
+                .exclude(company_name__isnull=True)
+                .exclude(company_name__exact="")
+                .values_list("company_name", flat=True)
+                .distinct()
+                .order_by("company_name")
+            ),
+            # EXISTS instead of a DISTINCT over the clients join
+            "agents": list(
+                User.objects
+                .filter(Exists(Client.objects.filter(agent=OuterRef("pk"))))
+                .only("id", "username", "first_name", "last_name")
+                .order_by("username")
+            ),
+            "cities": list(
+                Client.objects
+                .exclude(city_municipality__isnull=True)
+                .exclude(city_municipality__exact="")
+                .values_list("city_municipality", flat=True)
+                .distinct()
+                .order_by("city_municipality")
+            ),
+        }
+
+    return cache.get_or_set(CLIENT_TABLE_SUGGESTIONS_CACHE_KEY, build, 300)
+
+
+def get_product_id_choices():
+    """
+    Active Product ID rows for the PO table filter. Cached; the key is
+    cleared whenever a ProductID is saved or deleted.
+    """
+    return cache.get_or_set(
+        PRODUCT_ID_CHOICES_CACHE_KEY,
+        lambda: list(ProductID.objects.filter(is_active=True).order_by("code").values("id", "code")),
+        600,
+    )
+
+
 def root_redirect(request):
     if request.user.is_authenticated:
         return redirect("dr-kanban")
@@ -77,13 +155,20 @@ def root_redirect(request):
 @require_GET
 @login_required
 def client_detail_api(request, pk):
-    client = get_object_or_404(Client, pk=pk)
+    row = (
+        Client.objects
+        .filter(pk=pk)
+        .values("id", "company_name", "name_of_owner", "contact_number", *Client.ADDRESS_FIELDS)
+        .first()
+    )
+    if row is None:
+        raise Http404
     data = {
-        "id": client.id,
-        "company_name": client.company_name,
-        "name_of_owner": client.name_of_owner,
-        "contact_number": client.contact_number,
-        "full_address": client.full_address,
+        "id": row["id"],
+        "company_name": row["company_name"],
+        "name_of_owner": row["name_of_owner"],
+        "contact_number": row["contact_number"],
+        "full_address": Client.format_address(row[f] for f in Client.ADDRESS_FIELDS),
     }
     return JsonResponse(data)
 
@@ -91,14 +176,15 @@ def client_detail_api(request, pk):
 @require_GET
 @login_required
 def product_detail_api(request, pk):
-    product = get_object_or_404(Product, pk=pk)
-    data = {
-        "id": product.id,
-        "sku": product.sku,
-        "name": product.name,
-        "default_unit_price": str(product.default_unit_price or ""),
-        "unit": product.unit,
-    }
+    data = (
+        Product.objects
+        .filter(pk=pk)
+        .values("id", "sku", "name", "default_unit_price", "unit")
+        .first()
+    )
+    if data is None:
+        raise Http404
+    data["default_unit_price"] = str(data["default_unit_price"] or "")
     return JsonResponse(data)
 
 @require_GET
@@ -236,12 +322,21 @@ def client_create(request):
 #  DR CREATE / EDIT / DETAIL
 # =========================
 
+@lru_cache(maxsize=1)
+def ensure_d2d_stocks_client():
+    """
+    Make sure the internal D2D Stocks client exists. Only the first call per
+    process touches the database.
+    """
+    DeliveryReceipt.get_d2d_stocks_client()
+
+
 @login_required
 def dr_create(request):
     """
     Create a new DeliveryReceipt with items.
     """
-    DeliveryReceipt.get_d2d_stocks_client()
+    ensure_d2d_stocks_client()
 
     if request.method == "POST":
         form = DeliveryReceiptForm(request.POST, request.FILES or None, stage="NEW_DR", user=request.user)
@@ -273,142 +368,119 @@ def dr_create(request):
         "stage": "NEW_DR",
         "is_create": True,
         "updates": [],   # ✔ safe for create mode
-        "clients": Client.objects.all().order_by("company_name"),
+        "clients": get_client_choices(),
     }
     return render(request, "bondking_app/dr_form.html", context)
 
-@login_required
-def dr_edit(request, pk):
-    dr = get_object_or_404(DeliveryReceipt, pk=pk)
-    stage = dr.get_current_column()
-    updates = dr.updates.all()
-    action = None
-
-
-    role = get_user_role(request.user)
-    is_super = request.user.is_superuser
-
-    current_step, next_step = dr.get_current_and_next_step()
-    lifecycle_steps = dr.get_lifecycle_steps()
-    current_meta = DR_STEP_META.get(current_step, {})
-    next_meta = dr.get_next_step_meta()
-    # =========================
-    # DR NAVIGATION (Prev / Next)
-    # =========================
-    nav_qs = (
-        DeliveryReceipt.objects
-        .filter(is_archived=False, is_cancelled=False)
-        .order_by("id")
-    )
-
-    prev_dr = None
-    next_dr = None
-
-    nav_from = request.GET.get("from")
-    nav_ids = request.GET.get("nav_ids")
-
-    # Keep full querystring EXCEPT page (so prev/next keeps context)
-    qs = request.GET.copy()
-    qs.pop("page", None)
-    nav_querystring = qs.urlencode()
-    # =========================
-    # DR NAVIGATION (nav_ids OVERRIDE — NON-DESTRUCTIVE)
-    # =========================
-    prev_dr = None
-    next_dr = None
-
-    nav_ids = request.GET.get("nav_ids")
-
-    if nav_ids:
-        try:
-            id_list = [int(x) for x in nav_ids.split(",")]
-
-            if dr.id in id_list:
-                idx = id_list.index(dr.id)
+DR_SORT_OPTIONS = {
+    "date_desc": "-date_of_order",
+    "date_asc": "date_of_order",
+    "total_desc": "-total_amount",
+    "total_asc": "total_amount",
+    "dr_desc": "-dr_number",
+    "dr_asc": "dr_number",
+}
 
-                if idx > 0:
-                    prev_dr = DeliveryReceipt.objects.filter(id=id_list[idx - 1]).first()
 
-                if idx < len(id_list) - 1:
-                    next_dr = DeliveryReceipt.objects.filter(id=id_list[idx + 1]).first()
-        except Exception:
-            pass
-    # -------------------------------
-    # CASE 1: FROM KANBAN
-    # -------------------------------
-    if nav_from == "kanban" and nav_ids:
-        try:
-            id_list = [int(x) for x in nav_ids.split(",")]
-            if dr.id in id_list:
-                idx = id_list.index(dr.id)
-                if idx > 0:
-                    prev_dr = DeliveryReceipt.objects.filter(id=id_list[idx - 1]).first()
-                if idx < len(id_list) - 1:
-                    next_dr = DeliveryReceipt.objects.filter(id=id_list[idx + 1]).first()
-        except Exception:
-            pass
-
-    # -------------------------------
-    # CASE 2: FROM TABLE
-    # -------------------------------
-    elif nav_from == "table" and not nav_ids:
-        # IMPORTANT: reuse the SAME queryset logic as dr_table
-        qs_table = DeliveryReceipt.objects.all()
-
-        if request.GET.get("hide_archived"):
-            qs_table = qs_table.filter(is_archived=False)
-
-        if request.GET.get("hide_cancelled"):
-            qs_table = qs_table.filter(is_cancelled=False)
+def fetch_neighbors(qs, prev_id, next_id):
+    """
+    Load the prev/next records of a nav list in a single query.
+    """
+    wanted = [i for i in (prev_id, next_id) if i is not None]
+    if not wanted:
+        return None, None
+    found = qs.in_bulk(wanted)
+    return found.get(prev_id), found.get(next_id)
 
-        if request.GET.get("payment_status"):
-            qs_table = qs_table.filter(payment_status=request.GET["payment_status"])
 
-        if request.GET.get("delivery_status"):
-            qs_table = qs_table.filter(delivery_status=request.GET["delivery_status"])
+def seek_neighbors(qs, obj, sort_field):
+    """
+    Find the records just before/after `obj` in `qs` ordered by `sort_field`
+    (ties broken by id), using two bounded queries instead of listing ids.
+    """
+    descending = sort_field.startswith("-")
+    field = sort_field.lstrip("-")
+    value = getattr(obj, field)
+
+    greater = Q(**{f"{field}__gt": value}) | Q(**{field: value, "id__gt": obj.id})
+    lesser = Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": obj.id})
+    ascending = (field, "id")
+    reverse = (f"-{field}", "-id")
+
+    if descending:
+        prev_obj = qs.filter(greater).order_by(*ascending).first()
+        next_obj = qs.filter(lesser).order_by(*reverse).first()
+    else:
+        prev_obj = qs.filter(lesser).order_by(*reverse).first()
+        next_obj = qs.filter(greater).order_by(*ascending).first()
+    return prev_obj, next_obj
 
-        if request.GET.get("payment_method"):
-            qs_table = qs_table.filter(payment_method=request.GET["payment_method"])
 
-        if request.GET.get("delivery_method"):
-            qs_table = qs_table.filter(delivery_method=request.GET["delivery_method"])
+def keyset_order(sort_field):
+    """
+    ORDER BY for `sort_field` with id as the tie-breaker, as seek_page() expects.
+    """
+    return (sort_field, "-id" if sort_field.startswith("-") else "id")
 
-        if request.GET.get("client_name"):
-            qs_table = qs_table.filter(client__company_name__icontains=request.GET["client_name"])
 
-        if request.GET.get("dr_number"):
-            qs_table = qs_table.filter(dr_number__icontains=request.GET["dr_number"])
+def seek_page(paginator, number, after_id, sort_field):
+    """
+    paginator.get_page(number), but when `after_id` (the last row of the
+    previous page) is given, the page is read by seeking past that row on
+    (sort_field, id) instead of with OFFSET. `sort_field` must be non-null;
+    anything unusable falls back to the plain offset page.
+    """
+    after_id = clean_int(after_id)
+    if after_id is None:
+        return paginator.get_page(number)
+    try:
+        number = paginator.validate_number(number)
+    except (PageNotAnInteger, EmptyPage):
+        return paginator.get_page(number)
+
+    field = sort_field.lstrip("-")
+    anchor = paginator.object_list.filter(pk=after_id).values_list(field, flat=True)
+    if not anchor:
+        return paginator.get_page(number)
+    value = anchor[0]
+
+    if sort_field.startswith("-"):
+        past = Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": after_id})
+    else:
+        past = Q(**{f"{field}__gt": value}) | Q(**{field: value, "id__gt": after_id})
+    rows = list(paginator.object_list.filter(past)[:paginator.per_page])
+    return Page(rows, number, paginator)
 
-        if request.GET.get("with_sales_invoice"):
-            qs_table = qs_table.exclude(sales_invoice_no__isnull=True).exclude(sales_invoice_no="")
 
-        # ---- SORTING (MATCH dr_table EXACTLY)
-        sort_by = request.GET.get("sort_by", "date_desc")
+@login_required
+def dr_edit(request, pk):
+    dr = get_object_or_404(
+        DeliveryReceipt.objects.select_related("client", "agent", "created_by"),
+        pk=pk,
+    )
+    stage = dr.get_current_column()
+    updates = dr.updates.select_related("user")
 
-        if sort_by == "date_asc":
-            qs_table = qs_table.order_by("date_of_order")
-        elif sort_by == "total_desc":
-            qs_table = qs_table.order_by("-total_amount")
-        elif sort_by == "total_asc":
-            qs_table = qs_table.order_by("total_amount")
-        elif sort_by == "dr_desc":
-            qs_table = qs_table.order_by("-dr_number")
-        elif sort_by == "dr_asc":
-            qs_table = qs_table.order_by("dr_number")
-        else:
-            qs_table = qs_table.order_by("-date_of_order")
+    role = get_user_role(request.user)
+    is_super = request.user.is_superuser
+    top_mgmt = is_top_management(request.user)
 
-        ids = list(qs_table.values_list("id", flat=True))
+    # Step data is derived once here and reused for the whole request
+    steps = dr.get_lifecycle_steps()
+    current_step = stage
+    current_index = steps.index(stage) if stage in steps else -1
+    next_step = (
+        steps[current_index + 1]
+        if 0 <= current_index < len(steps) - 1
+        else None
+    )
+    current_meta = DR_STEP_META.get(current_step, {})
+    next_meta = DR_STEP_META.get(next_step) if next_step else None
 
-        if dr.id in ids:
-            idx = ids.index(dr.id)
-            if idx > 0:
-                prev_dr = qs_table.filter(id=ids[idx - 1]).first()
-            if idx < len(ids) - 1:
-                next_dr = qs_table.filter(id=ids[idx + 1]).first()
     # ==========================
     # ACTION HANDLING (PO STYLE)
     # ==========================
+    # Dispatched before navigation and form binding, which these don't need
     if request.method == "POST":
         action = request.POST.get("action")
 
@@ -420,7 +492,7 @@ def dr_edit(request, pk):
             dr.decline_current_step(request.user)
             return redirect("dr-edit", pk=dr.pk)
         if action == "archive":
-            if not (request.user.is_superuser or request.user.groups.filter(name="TopManagement").exists()):
+            if not top_mgmt:
                 messages.error(request, "Only Top Management can archive DRs.")
                 return redirect("dr-edit", pk=dr.pk)
 
@@ -434,12 +506,87 @@ def dr_edit(request, pk):
                 return redirect("dr-edit", pk=dr.pk)
 
 
-            dr.is_archived = True
-            dr.save(update_fields=["is_archived", "updated_at"])
-            dr.log_update(request.user, "Delivery Receipt was archived.")
+            with transaction.atomic():
+                dr.is_archived = True
+                dr.save(update_fields=["is_archived", "updated_at"])
+                dr.log_update(request.user, "Delivery Receipt was archived.")
             messages.success(request, "Delivery Receipt archived successfully.")
             return redirect("dr-edit", pk=dr.pk)
 
+        if action == "resolve":
+            if dr.approval_status != ApprovalStatus.DECLINED:
+                messages.error(request, "This DR is not rejected.")
+                return redirect("dr-edit", pk=dr.pk)
+
+            resolved_note = (request.POST.get("resolved_note") or "").strip()
+            if not resolved_note:
+                messages.error(request, "Resolution note is required.")
+                return redirect("dr-edit", pk=dr.pk)
+
+            # Permission: only roles that can move this step
+            allowed_roles = current_meta.get("forward_roles", EMPTY_ROLES)
+
+            if role not in allowed_roles and not is_super:
+                messages.error(request, "You are not allowed to resolve this DR.")
+                return redirect("dr-edit", pk=dr.pk)
+
+            with transaction.atomic():
+                dr.reject_solution = resolved_note
+                dr.approval_status = ApprovalStatus.PENDING
+                dr.save(update_fields=["reject_solution", "approval_status", "updated_at"])
+
+                dr.log_update(
+                    request.user,
+                    "Resolved rejection and returned DR to Pending approval.",
+                    user_notes=resolved_note,
+                )
+            return redirect("dr-edit", pk=dr.pk)
+
+    # =========================
+    # DR NAVIGATION (Prev / Next)
+    # =========================
+    prev_dr = None
+    next_dr = None
+
+    nav_from = request.GET.get("from")
+    nav_ids = request.GET.get("nav_ids")
+
+    # Keep full querystring EXCEPT page (so prev/next keeps context)
+    nav_querystring = urlencode([
+        (key, value)
+        for key, values in request.GET.lists()
+        if key != "page"
+        for value in values
+    ])
+    # -------------------------------
+    # CASE 1: FROM KANBAN (or any explicit nav_ids list)
+    # -------------------------------
+    if nav_ids:
+        try:
+            # Only parse up to this DR and its two neighbours
+            tokens = nav_ids.split(",")
+            idx = next((i for i, x in enumerate(tokens) if int(x) == dr.id), -1)
+            if idx >= 0:
+                prev_id = int(tokens[idx - 1]) if idx > 0 else None
+                next_id = int(tokens[idx + 1]) if idx < len(tokens) - 1 else None
+                prev_dr, next_dr = fetch_neighbors(DeliveryReceipt.objects.only("id"), prev_id, next_id)
+        except ValueError:
+            # Malformed nav_ids: just render without prev/next
+            pass
+
+    # -------------------------------
+    # CASE 2: FROM TABLE
+    # -------------------------------
+    elif nav_from == "table":
+        # IMPORTANT: reuse the SAME filters and sorting as dr_table
+        qs_table = DeliveryReceipt.objects.filter(dr_table_filter(request.GET))
+        sort_by = request.GET.get("sort_by", "dr_asc")
+        sort_field = DR_SORT_OPTIONS.get(sort_by, "-date_of_order")
+
+        # Seek to the neighbours on the sort key instead of loading every id;
+        # the nav links only need their ids
+        if qs_table.filter(pk=dr.pk).exists():
+            prev_dr, next_dr = seek_neighbors(qs_table.only("id"), dr, sort_field)
     # ==========================
     # FORMS (SAVE CHANGES ONLY)
     # ==========================
@@ -460,11 +607,12 @@ def dr_edit(request, pk):
 
     if request.method == "POST" and request.POST.get("action") == "save":
         if not form.is_valid():
-            print("DR FORM ERRORS:", form.errors)
+            logger.debug("DR FORM ERRORS: %s", form.errors)
         if not formset.is_valid():
-            print("DR FORMSET ERRORS:", formset.errors)
+            logger.debug("DR FORMSET ERRORS: %s", formset.errors)
         if form.is_valid() and formset.is_valid():
-            old = DeliveryReceipt.objects.get(pk=dr.pk)
+            # form.initial holds the instance values captured before binding
+            old_values = form.initial
 
             dr = form.save(commit=False)
             formset.save()
@@ -472,20 +620,21 @@ def dr_edit(request, pk):
 
 
             # ---- FIELD CHANGE LOGGING ----
+            actor = request.user.get_full_name() or request.user.username
+            log_entries = []
             for field in [
                 "date_of_delivery",
                 "payment_due",
                 "payment_details",
                 "remarks",
             ]:
-                old_val = getattr(old, field)
+                old_val = old_values.get(field)
                 new_val = getattr(dr, field)
                 if old_val != new_val:
                     label = field.replace("_", " ").title()
-                    message = dr.log_update(
-                        request.user,
-                        f"{label} was set to {new_val} by {request.user.get_full_name() or request.user.username}",
-                    )
+                    log_entries.append(f"{label} was set to {new_val} by {actor}")
+            if log_entries:
+                dr.log_update(request.user, log_entries)
 
             return redirect("dr-edit", pk=dr.pk)
 
@@ -495,71 +644,35 @@ def dr_edit(request, pk):
     # ==========================
     can_approve = (
         dr.approval_status == ApprovalStatus.PENDING
-        and (is_super or role in current_meta.get("approver_roles", set()))
+        and (is_super or role in current_meta.get("approver_roles", EMPTY_ROLES))
     )
 
     can_decline = (
         dr.approval_status == ApprovalStatus.PENDING
-        and (is_super or role in current_meta.get("decliner_roles", set()))
+        and (is_super or role in current_meta.get("decliner_roles", EMPTY_ROLES))
     )
 
     can_submit = (
         dr.approval_status == ApprovalStatus.APPROVED
         and next_step
-        and (is_super or role in current_meta.get("forward_roles", set()))
+        and (is_super or role in current_meta.get("forward_roles", EMPTY_ROLES))
     )
 
 
     lifecycle_steps = []
-    steps = dr.get_lifecycle_steps()
-    current = dr.get_current_column()
-    current_index = steps.index(current) if current in steps else -1
-
     for idx, s in enumerate(steps):
         lifecycle_steps.append({
             "key": s,
             "label": s.replace("_", " ").title(),
-            "is_current": s == current,
+            "is_current": s == current_step,
             "is_done": idx < current_index if current_index >= 0 else False,
         })
 
-    current_step, next_step = dr.get_current_and_next_step()
     missing_fields = dr.get_missing_required_before_forward()
 
 
     kanban_url = reverse("dr-kanban")  # adjust name if needed
 
-    if action == "resolve":
-        if dr.approval_status != ApprovalStatus.DECLINED:
-            messages.error(request, "This DR is not rejected.")
-            return redirect("dr-edit", pk=dr.pk)
-
-        resolved_note = (request.POST.get("resolved_note") or "").strip()
-        if not resolved_note:
-            messages.error(request, "Resolution note is required.")
-            return redirect("dr-edit", pk=dr.pk)
-
-        # Permission: only roles that can move this step
-        meta = DR_STEP_META.get(dr.get_current_column(), {})
-        allowed_roles = meta.get("forward_roles", set())
-        role = get_user_role(request.user)
-
-        if role not in allowed_roles and not request.user.is_superuser:
-            messages.error(request, "You are not allowed to resolve this DR.")
-            return redirect("dr-edit", pk=dr.pk)
-
-        dr.reject_solution = resolved_note
-        dr.approval_status = ApprovalStatus.PENDING
-        dr.save(update_fields=["reject_solution", "approval_status", "updated_at"])
-
-        dr.log_update(
-            request.user,
-            "Resolved rejection and returned DR to Pending approval.",
-            user_notes=resolved_note,
-        )
-        return redirect("dr-edit", pk=dr.pk)
-
-
     # ==========================
     # CONTEXT
     # ==========================
@@ -583,8 +696,8 @@ def dr_edit(request, pk):
         "kanban_url": kanban_url,
         "dr_flow": lifecycle_steps,
         "has_missing_required": bool(missing_fields),
-        "is_top_management": is_top_management(request.user),
-        "clients": Client.objects.all().order_by("company_name"),
+        "is_top_management": top_mgmt,
+        "clients": get_client_choices(),
         "prev_dr": prev_dr,
         "next_dr": next_dr,
         "nav_querystring": nav_querystring,
@@ -596,100 +709,97 @@ def dr_edit(request, pk):
 
 @login_required
 def dr_detail(request, pk):
-    dr = get_object_or_404(DeliveryReceipt, pk=pk)
+    dr = get_object_or_404(
+        DeliveryReceipt.objects.select_related("client", "agent", "created_by"),
+        pk=pk,
+    )
     return render(request, "bondking_app/dr_detail.html", {"dr": dr})
 
 
 # =========================
 #  KANBAN BOARD
 # =========================
+# Labels for each column
+KANBAN_COLUMN_LABELS = {
+    "NEW_DR": "New DR",
+    "FOR_DELIVERY": "For Delivery",
+    "DELIVERED": "Delivered",
+    "FOR_COUNTER_CREATION": "For Counter Creation",
+    "FOR_COUNTERING": "For Countering",
+    "COUNTERED": "Countered",
+    "FOR_COLLECTION": "For Collection",
+    "FOR_DEPOSIT": "For Deposit",
+    "DEPOSITED": "Deposited",
+}
+
+
 @login_required
 def dr_kanban(request):
     """
     Render the DR Kanban board.
     """
-    active_drs = (
-    DeliveryReceipt.objects
-    .filter(is_archived=False, is_cancelled=False)
-    .select_related("client", "agent")
-    .order_by("-created_at")
-    )
-
-    normal_drs = active_drs.exclude(
-        delivery_method=DeliveryMethod.D2D_STOCKS
-    )
-
-    d2d_stocks = active_drs.filter(
-        delivery_method=DeliveryMethod.D2D_STOCKS
-    )
-    column_items = {col: [] for col in KANBAN_COLUMNS}
-
     user = request.user
     role = get_user_role(user)
     is_super = user.is_superuser
     top_mgmt = is_top_management(user)
 
-    for dr in normal_drs:
-        current_step = dr.get_current_column()
-        step_meta = DR_STEP_META.get(current_step, {})
-
-        dr.can_approve = (
-            dr.approval_status == ApprovalStatus.PENDING
-            and (
-                is_super
-                or top_mgmt
-                or role in step_meta.get("approver_roles", set())
-            )
-        )
+    # Permissions only depend on the step, so resolve them per step up front
+    approver_steps = {
+        step for step, meta in DR_STEP_META.items()
+        if is_super or top_mgmt or role in meta["approver_roles"]
+    }
+    decliner_steps = {
+        step for step, meta in DR_STEP_META.items()
+        if is_super or top_mgmt or role in meta["decliner_roles"]
+    }
 
-        dr.can_decline = (
-            dr.approval_status == ApprovalStatus.PENDING
-            and (
-                is_super
-                or top_mgmt
-                or role in step_meta.get("decliner_roles", set())
-            )
+    active_drs = (
+        DeliveryReceipt.objects
+        .filter(is_archived=False, is_cancelled=False)
+        .select_related("client", "agent")
+        .only(
+            "id",
+            "dr_number",
+            "approval_status",
+            "delivery_method",
+            "payment_method",
+            "date_of_order",
+            "total_amount",
+            "client__company_name",
+            "agent__username",
         )
+        .annotate(_current_column=DeliveryReceipt.current_column_expression())
+        .order_by("-created_at")
+    )
 
-        column_items[current_step].append(dr)
-
-
-
+    column_items = defaultdict(list)
+    d2d_stocks = []
 
-    d2d_stocks = DeliveryReceipt.objects.filter(
-        delivery_method=DeliveryMethod.D2D_STOCKS,
-        is_archived=False
-    )
+    # Single streamed pass: D2D stocks aside, everything else into its column
+    for dr in active_drs.iterator(chunk_size=200):
+        if dr.delivery_method == DeliveryMethod.D2D_STOCKS:
+            d2d_stocks.append(dr)
+            continue
 
+        current_step = dr._current_column
+        is_pending = dr.approval_status == ApprovalStatus.PENDING
 
+        dr.can_approve = is_pending and current_step in approver_steps
+        dr.can_decline = is_pending and current_step in decliner_steps
 
-    # Labels for each column
-    column_labels = {
-        "NEW_DR": "New DR",
-        "FOR_DELIVERY": "For Delivery",
-        "DELIVERED": "Delivered",
-        "FOR_COUNTER_CREATION": "For Counter Creation",
-        "FOR_COUNTERING": "For Countering",
-        "COUNTERED": "Countered",
-        "FOR_COLLECTION": "For Collection",
-        "FOR_DEPOSIT": "For Deposit",
-        "DEPOSITED": "Deposited",
-    }
+        column_items[current_step].append(dr)
 
     # Build render-friendly list to avoid any dict indexing in the template
-    columns_render = []
-    for key in KANBAN_COLUMNS:
-        columns_render.append(
-            {
-                "key": key,
-                "label": column_labels.get(key, key),
-                "items": column_items.get(key, []),
-            }
-        )
+    columns_render = [
+        {
+            "key": key,
+            "label": KANBAN_COLUMN_LABELS.get(key, key),
+            "items": column_items[key],
+        }
+        for key in KANBAN_COLUMNS
+    ]
 
-    user = request.user
-    is_admin_like = user.is_superuser 
-    role = get_user_role(user)
+    is_admin_like = user.is_superuser
 
     available_roles = [
         ("SalesAgent", "Sales Agent"),
@@ -700,14 +810,13 @@ def dr_kanban(request):
         ("AccountingHead", "Accounting Head"),
         ("TopManagement", "Top Management"),
     ]
-    top_mgmt = is_top_management(user)
 
     context = {
         "columns_render": columns_render,
         "is_admin_like": is_admin_like,
         "available_roles": available_roles if is_admin_like else [],
         "d2d_stocks": d2d_stocks,
-        "column_items": column_items,
+        "column_items": dict(column_items),
         "KANBAN_COLUMNS": KANBAN_COLUMNS,
         "is_top_management": top_mgmt,
     }
@@ -716,6 +825,36 @@ def dr_kanban(request):
 #  KANBAN ACTIONS (MOVE / APPROVE / DECLINE)
 # =========================
 
+# (attname, verbose_name) of each column's required fields, resolved once.
+# attname keeps FK checks (e.g. client -> client_id) from loading the row.
+DR_REQUIRED_FIELDS = {
+    column: [
+        (DeliveryReceipt._meta.get_field(name).attname, DeliveryReceipt._meta.get_field(name).verbose_name)
+        for name in meta.get("required_fields", [])
+    ]
+    for column, meta in DR_STEP_META.items()
+}
+
+# Zeroed per-column template, copied rather than rebuilt on each count.
+_EMPTY_COUNTS = MappingProxyType({col: 0 for col in KANBAN_COLUMNS})
+
+
+def kanban_column_counts():
+    """
+    Number of DRs per kanban column, counted in one grouped query.
+    """
+    counts = dict(_EMPTY_COUNTS)
+    counts.update(
+        DeliveryReceipt.objects
+        .annotate(column=DeliveryReceipt.current_column_expression())
+        .values("column")
+        .annotate(n=Count("id"))
+        .order_by()
+        .values_list("column", "n")
+    )
+    return counts
+
+
 @require_POST
 @login_required
 def move_dr(request, pk):
@@ -728,17 +867,14 @@ def move_dr(request, pk):
     # ENFORCE REQUIRED FIELDS
     # ==========================
     step_meta = DR_STEP_META.get(target_column, {})
-    required_fields = step_meta.get("required_fields", [])
-
-    for field_name in required_fields:
-        value = getattr(dr, field_name, None)
 
-        if not value:
-            verbose = dr._meta.get_field(field_name).verbose_name
+    for attname, verbose in DR_REQUIRED_FIELDS.get(target_column, ()):
+        if not getattr(dr, attname, None):
             return JsonResponse({
                 "ok": False,
                 "error": f"{verbose} is required before proceeding to {step_meta.get('label', target_column)}."
             }, status=400)
+
     try:
         dr.move_to_column(
             request.user,
@@ -746,8 +882,6 @@ def move_dr(request, pk):
             user_notes=notes,
             simulated_role=sim_role,
         )
-    except (ValidationError, PermissionDenied) as e:
-        return JsonResponse({"ok": False, "error": str(e)}, status=400)
     except ValidationError as e:
         return JsonResponse({
             "ok": False,
@@ -755,9 +889,10 @@ def move_dr(request, pk):
         }, status=400)
 
     except PermissionDenied as e:
+        # Keep the model's reason (e.g. which role may not make this move)
         return JsonResponse({
             "ok": False,
-            "error": "You do not have permission to perform this action.",
+            "error": str(e),
         }, status=403)
 
     except Exception as e:
@@ -769,11 +904,9 @@ def move_dr(request, pk):
             "error": str(e),
         }, status=500)
 
-    # Recalculate counts per column for the board
-    counts = {col: 0 for col in KANBAN_COLUMNS}
-    for d in DeliveryReceipt.objects.all():
-        col = d.get_current_column()
-        counts[col] = counts.get(col, 0) + 1
+    # Recounted after the move: one grouped query, always current
+    new_col = dr.get_current_column()
+    counts = kanban_column_counts()
 
     latest = dr.updates.first()
     system_message = latest.system_update if latest else ""
@@ -781,7 +914,7 @@ def move_dr(request, pk):
     return JsonResponse(
         {
             "ok": True,
-            "new_column": dr.get_current_column(),
+            "new_column": new_col,
             "approval_status": dr.approval_status,
             "delivery_status": dr.delivery_status,
             "payment_status": dr.payment_status,
@@ -847,44 +980,42 @@ def dr_decline(request, pk):
 
     sim_role = request.POST.get("sim_role") or None
 
-    # First attempt the decline
-    try:
-        reject_problem = (request.POST.get("reject_problem") or "").strip()
-        reject_solution = (request.POST.get("reject_solution") or "").strip()
-
-        if not reject_problem:
-            return JsonResponse(
-                {"ok": False, "error": "Rejection reason is required."},
-                status=400,
-            )
+    reject_problem = (request.POST.get("reject_problem") or "").strip()
+    reject_solution = (request.POST.get("reject_solution") or "").strip()
 
-        dr.reject_problem = reject_problem
-        dr.reject_solution = reject_solution
-
-        dr.decline_current_step(
-            request.user,
-            user_notes=reject_problem,
-            simulated_role=sim_role,
+    if not reject_problem:
+        return JsonResponse(
+            {"ok": False, "error": "Rejection reason is required."},
+            status=400,
         )
-        dr.save(update_fields=["reject_problem", "reject_solution", "approval_status", "updated_at"])
-
-    except (ValidationError, PermissionDenied) as e:
-        return JsonResponse({"ok": False, "error": str(e)}, status=400)
 
-    # ============================================================
-    # SPECIAL RULE FOR CASH DRs:
-    # If declined while in FOR_DEPOSIT → move back to DELIVERED
-    # ============================================================
+    # Decline, notes and the cash-rule revert commit together or not at all
     try:
-        pm = str(dr.payment_method).upper()
-        current_column = dr.get_current_column()
-
-        if pm == "CASH" and current_column == "FOR_DEPOSIT":
-            dr.move_to_column(
-                user=request.user,
-                target_column="DELIVERED",
-                user_notes="Declined at For Deposit – Auto-reverted to Delivered (Cash rule)",
+        with transaction.atomic():
+            dr.decline_current_step(
+                request.user,
+                user_notes=reject_problem,
+                simulated_role=sim_role,
+            )
+            # The decline already saved the status columns; only the notes remain
+            DeliveryReceipt.objects.filter(pk=dr.pk).update(
+                reject_problem=reject_problem,
+                reject_solution=reject_solution,
             )
+            dr.reject_problem = reject_problem
+            dr.reject_solution = reject_solution
+
+            # ============================================================
+            # SPECIAL RULE FOR CASH DRs:
+            # If declined while in FOR_DEPOSIT → move back to DELIVERED
+            # ============================================================
+            pm = str(dr.payment_method).upper()
+            if pm == "CASH" and dr.get_current_column() == "FOR_DEPOSIT":
+                dr.move_to_column(
+                    user=request.user,
+                    target_column="DELIVERED",
+                    user_notes="Declined at For Deposit – Auto-reverted to Delivered (Cash rule)",
+                )
     except (ValidationError, PermissionDenied) as e:
         return JsonResponse({"ok": False, "error": str(e)}, status=400)
     latest = dr.updates.first()
@@ -902,7 +1033,7 @@ def dr_decline(request, pk):
 @require_POST
 @login_required
 def archive_dr(request, dr_id):
-    if not request.user.groups.filter(name="TopManagement").exists() and not request.user.is_superuser:
+    if not is_top_management(request.user):
         raise PermissionDenied("Only Top Management can archive DRs.")
 
     dr = get_object_or_404(DeliveryReceipt, pk=dr_id)
@@ -914,11 +1045,10 @@ def archive_dr(request, dr_id):
     if not can_archive:
         return JsonResponse({"ok": False, "error": "This DR is not yet eligible for archiving."}, status=400)
 
-    dr.is_archived = True
-    dr.save(update_fields=["is_archived", "updated_at"])
-    dr.log_update(request.user, "Archived DR.")
-    latest = dr.updates.first()
-    return JsonResponse({"ok": True, "system_message": latest.system_update if latest else ""})
+    with transaction.atomic():
+        DeliveryReceipt.objects.filter(pk=dr.pk).update(is_archived=True, updated_at=timezone.now())
+        entry = dr.log_update(request.user, "Archived DR.")
+    return JsonResponse({"ok": True, "system_message": entry.system_update})
 
 
 
@@ -928,41 +1058,45 @@ def d2d_transactions_api(request, pk):
     Returns per-product breakdown of d2d Stocks usage
     """
     dr = get_object_or_404(
-        DeliveryReceipt,
+        DeliveryReceipt.objects.select_related("agent"),
         pk=pk,
         delivery_method=DeliveryMethod.D2D_STOCKS,
         is_archived=False,
     )
+    items = list(dr.items.select_related("product"))
+
+    # All Door-to-Door usage of this stock DR in one query, bucketed by product
+    transactions_by_product = defaultdict(list)
+    d2d_items = (
+        DeliveryReceiptItem.objects
+        .filter(
+            delivery_receipt__delivery_method=DeliveryMethod.DOOR_TO_DOOR,
+            delivery_receipt__source_dr=dr,
+            delivery_receipt__is_cancelled=False,
+            product_id__in={item.product_id for item in items},
+        )
+        .select_related("delivery_receipt", "delivery_receipt__client")
+    )
+    for i in d2d_items:
+        transactions_by_product[i.product_id].append({
+            "dr_number": i.delivery_receipt.dr_number,
+            "client": i.delivery_receipt.client.company_name if i.delivery_receipt.client else "—",
+            "date": i.delivery_receipt.date_of_order.strftime("%Y-%m-%d"),
+            "quantity": i.quantity,
+        })
 
-    # Build item breakdown
+    # Build item breakdown; archivable once every line is fully used
     result = []
+    can_archive = True
 
-    for item in dr.items.select_related("product"):
+    for item in items:
         issued_qty = item.quantity
+        transactions = transactions_by_product[item.product_id]
 
-        d2d_items = (
-            DeliveryReceiptItem.objects
-            .filter(
-                delivery_receipt__delivery_method=DeliveryMethod.DOOR_TO_DOOR,
-                delivery_receipt__source_dr=dr,
-                delivery_receipt__is_cancelled=False,
-                product=item.product,
-            )
-            .select_related("delivery_receipt", "delivery_receipt__client")
-        )
-
-
-        used_qty = sum(i.quantity for i in d2d_items)
+        used_qty = sum(t["quantity"] for t in transactions)
         remaining_qty = issued_qty - used_qty
-
-        transactions = []
-        for i in d2d_items:
-            transactions.append({
-                "dr_number": i.delivery_receipt.dr_number,
-                "client": i.delivery_receipt.client.company_name if i.delivery_receipt.client else "—",
-                "date": i.delivery_receipt.date_of_order.strftime("%Y-%m-%d"),
-                "quantity": i.quantity,
-            })
+        if remaining_qty > 0:
+            can_archive = False
 
         result.append({
             # ---- AUTOFILL DATA ----
@@ -978,9 +1112,6 @@ def d2d_transactions_api(request, pk):
             "transactions": transactions,
         })
 
-
-    can_archive = all(r["remaining_qty"] <= 0 for r in result)
-
     return JsonResponse({
         "ok": True,
         "dr_number": dr.dr_number,
@@ -1035,27 +1166,117 @@ def excel_safe_datetime(value):
 
     return value
 
+
+# =========================
+#  DR TABLE FILTERS (shared by dr_table and its prev/next navigation)
+# =========================
+# Multi-valued GET params matched exactly
+DR_TABLE_IN_FILTERS = {
+    "payment_method": "payment_method__in",
+    "payment_status": "payment_status__in",
+    "delivery_status": "delivery_status__in",
+    "delivery_method": "delivery_method__in",
+}
+# Multi-valued search tags, any of which may match
+DR_TABLE_SEARCH_FILTERS = {
+    "client_name": "client__company_name__icontains",
+    "dr_number": "dr_number__icontains",
+}
+# Single-valued date bounds
+DR_TABLE_RANGE_FILTERS = {
+    "start_date": "date_of_order__gte",
+    "end_date": "date_of_order__lte",
+    "due_start": "payment_due__gte",
+    "due_end": "payment_due__lte",
+}
+
+
+def dr_table_filter(params):
+    """
+    Build the DR table filters from its GET params as a single Q.
+    """
+    lookups = {}
+    for key, lookup in DR_TABLE_IN_FILTERS.items():
+        values = [v for v in params.getlist(key) if v]
+        if values:
+            lookups[lookup] = values
+
+    for key, lookup in DR_TABLE_RANGE_FILTERS.items():
+        if params.get(key):
+            lookups[lookup] = params[key]
+
+    agent_ids = clean_int_list(params.getlist("agent"))
+    if agent_ids:
+        lookups["agent_id__in"] = agent_ids
+
+    client = clean_param(params.get("client"))
+    if client and client.isdigit():
+        lookups["client_id"] = int(client)
+
+    if params.get("hide_archived") == "1":
+        lookups["is_archived"] = False
+    if params.get("hide_cancelled") == "1":
+        lookups["is_cancelled"] = False
+
+    cond = Q(**lookups)
+
+    if params.get("with_sales_invoice") == "1":
+        cond &= Q(sales_invoice_no__isnull=False) & ~Q(sales_invoice_no="")
+
+    for key, lookup in DR_TABLE_SEARCH_FILTERS.items():
+        values = [v.strip() for v in params.getlist(key) if v.strip()]
+        if values:
+            any_of = Q()
+            for value in values:
+                any_of |= Q(**{lookup: value})
+            cond &= any_of
+
+    # ---- Free-text keyword maps to Client OR Agent ----
+    q = (params.get("q") or "").strip()
+    if q:
+        cond &= (
+            Q(client__company_name__icontains=q) |
+            Q(agent__username__icontains=q) |
+            Q(agent__first_name__icontains=q) |
+            Q(agent__last_name__icontains=q)
+        )
+    return cond
+
+
 @login_required
 def dr_table(request):
     qs = (
         DeliveryReceipt.objects
         .select_related("client", "agent")
-        .prefetch_related("items__product")
+        # The Items cell only lists product names
+        .prefetch_related(
+            Prefetch(
+                "items",
+                queryset=DeliveryReceiptItem.objects
+                .select_related("product")
+                .only("delivery_receipt_id", "product__name"),
+            )
+        )
+        # Only the columns the table renders; skips remarks/notes/file paths
+        .only(
+            "dr_number",
+            "date_of_order",
+            "delivery_method",
+            "delivery_status",
+            "payment_method",
+            "payment_status",
+            "sales_invoice_no",
+            "total_amount",
+            "is_archived",
+            "is_cancelled",
+            "client__company_name",
+            "agent__username",
+            "agent__first_name",
+            "agent__last_name",
+        )
     )
 
-    # -------------------
-    # Show All logic
-    # -------------------
-    def clean_param(val):
-        """
-        Returns None if the param is empty, 'None', 'null', etc.
-        """
-        if val in (None, "", "None", "null", "undefined"):
-            return None
-        return val
-
-
-    # ---- Smart search tags (multi) ----
+    # ---- Smart search tags (multi), echoed back to the template ----
     agent_ids = clean_int_list(request.GET.getlist("agent"))
     client_names = [c.strip() for c in request.GET.getlist("client_name") if c.strip()]  # ✅ name-based only
     dr_numbers = [d.strip() for d in request.GET.getlist("dr_number") if d.strip()]
@@ -1064,12 +1285,9 @@ def dr_table(request):
     payment_statuses = [p for p in request.GET.getlist("payment_status") if p]
     delivery_statuses = [d for d in request.GET.getlist("delivery_status") if d]
     delivery_methods = [d for d in request.GET.getlist("delivery_method") if d]
-    
+
     # ---- Free-text keyword (client OR agent) ----
     q = (request.GET.get("q") or "").strip()
-    # -------------------
-    # Filters
-    # -------------------
 
     start_date = request.GET.get("start_date", "")
     end_date = request.GET.get("end_date", "")
@@ -1079,111 +1297,30 @@ def dr_table(request):
     hide_archived = request.GET.get("hide_archived") == "1"
     hide_cancelled = request.GET.get("hide_cancelled") == "1"
     with_sales_invoice = request.GET.get("with_sales_invoice") == "1"
-
-
-    if hide_archived:
-        qs = qs.filter(is_archived=False)
-
-    if hide_cancelled:
-        qs = qs.filter(is_cancelled=False)
-
-
-    if with_sales_invoice:
-        qs = qs.exclude(
-            sales_invoice_no__isnull=True
-        ).exclude(
-            sales_invoice_no__exact=""
-        )
-
-    # --- DR numbers (multi) ---
-    if dr_numbers:
-        q_obj = Q()
-        for drn in dr_numbers:
-            q_obj |= Q(dr_number__icontains=drn)
-        qs = qs.filter(q_obj)
-
-
-    if due_start:
-        qs = qs.filter(payment_due__gte=due_start)
-
-    if due_end:
-        qs = qs.filter(payment_due__lte=due_end)
-
-    # --- Delivery method (multi) ---
-    if delivery_methods:
-        qs = qs.filter(delivery_method__in=delivery_methods)
-
-    # --- Agent (multi) ---
-    if agent_ids:
-        qs = qs.filter(agent_id__in=agent_ids)
-
-    # --- Client name (multi, NAME-BASED ONLY) ---
-    if client_names:
-        q_obj = Q()
-        for cname in client_names:
-            q_obj |= Q(client__company_name__icontains=cname)
-        qs = qs.filter(q_obj)
-
-    # --- Payment/Delivery filters (multi) ---
-    if payment_methods:
-        qs = qs.filter(payment_method__in=payment_methods)
-
-    if payment_statuses:
-        qs = qs.filter(payment_status__in=payment_statuses)
-
-    if delivery_statuses:
-        qs = qs.filter(delivery_status__in=delivery_statuses)
-
-    if start_date:
-        qs = qs.filter(date_of_order__gte=start_date)
-
-    if end_date:
-        qs = qs.filter(date_of_order__lte=end_date)
-
     client = clean_param(request.GET.get("client"))
 
-    if client and client.isdigit():
-        qs = qs.filter(client_id=int(client))
-
-    # --- Free-text keyword maps to Client OR Agent ---
-    if q:
-        qs = qs.filter(
-            Q(client__company_name__icontains=q) |
-            Q(agent__username__icontains=q) |
-            Q(agent__first_name__icontains=q) |
-            Q(agent__last_name__icontains=q)
-        )
-    SORT_OPTIONS = {
-        "date_desc": "-date_of_order",
-        "date_asc": "date_of_order",
-        "total_desc": "-total_amount",
-        "total_asc": "total_amount",
-        "dr_desc": "-dr_number",
-        "dr_asc": "dr_number",
-    }
-    qs = qs.order_by(SORT_OPTIONS.get(sort_by, "-date_of_order"))
-
-    # ---- Client display value (for template only) ----
-    client_display = ""
-
-    if client and client.isdigit():
-        try:
-            client_display = Client.objects.get(pk=int(client)).company_name
-        except Client.DoesNotExist:
-            client_display = ""
+    # -------------------
+    # Filters
+    # -------------------
+    qs = qs.filter(dr_table_filter(request.GET))
+    # Same id tie-break as dr_edit's seek_neighbors(), so prev/next follow the table
+    qs = qs.order_by(*keyset_order(DR_SORT_OPTIONS.get(sort_by, "-date_of_order")))
 
     # -------------------
     # Pagination (LAST)
     # -------------------
+    # Row count and footer total in one query; the count is always current
+    summary = qs.aggregate(n=Count("id"), total=Sum("total_amount"))
     paginator = Paginator(qs, 100)
+    paginator.count = summary["n"]
     page_obj = paginator.get_page(request.GET.get("page", 1))
+
+    # ---- Client display value (for template only) ----
     client_display = ", ".join(client_names) if client_names else q
-    total_sum = qs.aggregate(total=Sum("total_amount"))["total"] or 0
+    total_sum = summary["total"] or 0
 
     context = {
         "page_obj": page_obj,
-        "clients": Client.objects.all().order_by("company_name"),
-        "agents": User.objects.all().order_by("username"),
         "payment_methods": PaymentMethod.choices,
         "payment_statuses": PaymentStatus.choices,
         "delivery_statuses": DeliveryStatus.choices,
@@ -1220,20 +1357,20 @@ def dr_table(request):
 def dr_items_api(request, pk):
     from .models import DeliveryReceipt
 
-    dr = get_object_or_404(
-        DeliveryReceipt.objects.select_related("client", "agent").prefetch_related("items__product"),
-        pk=pk,
-    )
+    dr = get_object_or_404(DeliveryReceipt.objects.only("id", "dr_number"), pk=pk)
 
-    items = []
-    for it in dr.items.all():
-        items.append({
-            "product": it.product.name,
-            "description": it.description or "",
-            "quantity": float(it.quantity),
-            "unit_price": float(it.unit_price),
-            "line_total": float(it.line_total),
-        })
+    # Read-only JSON: plain rows are enough, no item/product instances needed
+    rows = dr.items.values("product__name", "description", "quantity", "unit_price", "line_total")
+    items = [
+        {
+            "product": row["product__name"],
+            "description": row["description"] or "",
+            "quantity": float(row["quantity"]),
+            "unit_price": float(row["unit_price"]),
+            "line_total": float(row["line_total"]),
+        }
+        for row in rows
+    ]
 
     return JsonResponse({
         "ok": True,
@@ -1292,10 +1429,10 @@ def po_create(request):
             formset.save()
             return redirect("po-edit", pk=po.pk)
         if not form.is_valid():
-            print("FORM ERRORS:", form.errors)
+            logger.debug("FORM ERRORS: %s", form.errors)
 
         if not formset.is_valid():
-            print("FORMSET ERRORS:", formset.errors)
+            logger.debug("FORMSET ERRORS: %s", formset.errors)
 
     else:
         form = PurchaseOrderForm(stage="PURCHASE_ORDER_CREATION", user=request.user)
@@ -1396,16 +1533,18 @@ def po_edit(request, pk):
         stage=po.status,
         user=request.user,
     )
-    print("=== VALIDATION DEBUG ===")
-    print("PO form valid:", form.is_valid())
-    print("PO errors:", form.errors)
-
-    print("Particulars valid:", formset.is_valid())
-    print("Particulars errors:", formset.errors)
-
-    print("Billing valid:", billing_formset.is_valid())
-    print("Billing errors:", billing_formset.errors)
-    print("Billing non-form errors:", billing_formset.non_form_errors())
+    # Validating the forms is real work; only do it when debug logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("=== VALIDATION DEBUG ===")
+        logger.debug("PO form valid: %s", form.is_valid())
+        logger.debug("PO errors: %s", form.errors)
+
+        logger.debug("Particulars valid: %s", formset.is_valid())
+        logger.debug("Particulars errors: %s", formset.errors)
+
+        logger.debug("Billing valid: %s", billing_formset.is_valid())
+        logger.debug("Billing errors: %s", billing_formset.errors)
+        logger.debug("Billing non-form errors: %s", billing_formset.non_form_errors())
     if request.method == "POST" and request.POST.get("action") == "save":
         form = PurchaseOrderForm(
             request.POST or None,
@@ -1445,14 +1584,14 @@ def po_edit(request, pk):
             return redirect("po-edit", po.id)
 
         if not form.is_valid():
-            print("PO FORM ERRORS:", form.errors)
+            logger.debug("PO FORM ERRORS: %s", form.errors)
 
         if not formset.is_valid():
-            print("PARTICULARS FORMSET ERRORS:", formset.errors)
+            logger.debug("PARTICULARS FORMSET ERRORS: %s", formset.errors)
 
         if not billing_formset.is_valid():
-            print("BILLING FORMSET ERRORS:", billing_formset.errors)
-            print("BILLING NON-FORM ERRORS:", billing_formset.non_form_errors())
+            logger.debug("BILLING FORMSET ERRORS: %s", billing_formset.errors)
+            logger.debug("BILLING NON-FORM ERRORS: %s", billing_formset.non_form_errors())
 
     # ==========================
     # EDIT PERMISSIONS
@@ -1711,109 +1850,28 @@ def dr_table_export(request):
     qs = DeliveryReceipt.objects.select_related(
         "client", "agent", "created_by", "source_dr"
     )
-    # -------------------
-    # SAME FILTERS AS dr_table (SMART, MULTI)
-    # -------------------
-
-    agent_ids = clean_int_list(request.GET.getlist("agent"))
-    client_names = [c.strip() for c in request.GET.getlist("client_name") if c.strip()]
-    dr_numbers = [d.strip() for d in request.GET.getlist("dr_number") if d.strip()]
-
-    payment_methods = [p for p in request.GET.getlist("payment_method") if p]
-    payment_statuses = [p for p in request.GET.getlist("payment_status") if p]
-    delivery_statuses = [d for d in request.GET.getlist("delivery_status") if d]
-    delivery_methods = [d for d in request.GET.getlist("delivery_method") if d]
-
-    q = (request.GET.get("q") or "").strip()
-
-    hide_archived = request.GET.get("hide_archived") == "1"
-    hide_cancelled = request.GET.get("hide_cancelled") == "1"
-    with_sales_invoice = request.GET.get("with_sales_invoice") == "1"
-
-    start_date = request.GET.get("start_date")
-    end_date = request.GET.get("end_date")
-    due_start = request.GET.get("due_start")
-    due_end = request.GET.get("due_end")
-
-    # ---- Visibility flags ----
-    if hide_archived:
-        qs = qs.filter(is_archived=False)
-
-    if hide_cancelled:
-        qs = qs.filter(is_cancelled=False)
-
-    if with_sales_invoice:
-        qs = qs.exclude(sales_invoice_no__isnull=True).exclude(sales_invoice_no="")
-
-    # ---- Agent (multi) ----
-    if agent_ids:
-        qs = qs.filter(agent_id__in=agent_ids)
-
-    # ---- Client name (multi, NAME-BASED ONLY) ----
-    if client_names:
-        q_obj = Q()
-        for cname in client_names:
-            q_obj |= Q(client__company_name__icontains=cname)
-        qs = qs.filter(q_obj)
-
-    # ---- DR numbers (multi) ----
-    if dr_numbers:
-        q_obj = Q()
-        for drn in dr_numbers:
-            q_obj |= Q(dr_number__icontains=drn)
-        qs = qs.filter(q_obj)
-
-    # ---- Payment / Delivery filters (multi) ----
-    if payment_methods:
-        qs = qs.filter(payment_method__in=payment_methods)
-
-    if payment_statuses:
-        qs = qs.filter(payment_status__in=payment_statuses)
-
-    if delivery_statuses:
-        qs = qs.filter(delivery_status__in=delivery_statuses)
-
-    if delivery_methods:
-        qs = qs.filter(delivery_method__in=delivery_methods)
-
-    # ---- Date filters ----
-    if start_date:
-        qs = qs.filter(date_of_order__gte=start_date)
-
-    if end_date:
-        qs = qs.filter(date_of_order__lte=end_date)
-
-    if due_start:
-        qs = qs.filter(payment_due__gte=due_start)
-
-    if due_end:
-        qs = qs.filter(payment_due__lte=due_end)
-
-    # ---- Free-text keyword (client OR agent) ----
-    if q:
-        qs = qs.filter(
-            Q(client__company_name__icontains=q) |
-            Q(agent__username__icontains=q) |
-            Q(agent__first_name__icontains=q) |
-            Q(agent__last_name__icontains=q)
-        )
-
-    SORT_OPTIONS = {
-        "date_desc": "-date_of_order",
-        "date_asc": "date_of_order",
-        "total_desc": "-total_amount",
-        "total_asc": "total_amount",
-        "dr_desc": "-dr_number",
-        "dr_asc": "dr_number",
-    }
-
+    # Same filters and sort as dr_table, so the export matches the screen
+    qs = qs.filter(dr_table_filter(request.GET))
     sort_by = request.GET.get("sort_by", "dr_asc")
-    qs = qs.order_by(SORT_OPTIONS.get(sort_by, "-date_of_order"))
+    # Same order as dr_table
+    qs = qs.order_by(*keyset_order(DR_SORT_OPTIONS.get(sort_by, "-date_of_order")))
+
+    # Only the exported columns
+    qs = qs.only(
+        "dr_number",
+        "date_of_order", "date_of_delivery", "due_date", "payment_due",
+        "delivery_status", "payment_status", "payment_method", "delivery_method",
+        "total_amount", "approval_status", "remarks", "payment_details",
+        "created_at", "updated_at", "is_archived",
+        "client__company_name",
+        "agent__first_name", "agent__last_name", "agent__username",
+        "source_dr__dr_number",
+        "created_by__first_name", "created_by__last_name", "created_by__username",
+    )
 
-    # ---- EXCEL ----
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Delivery Receipts"
+    # ---- EXCEL (write-only: rows are streamed, not kept as cells) ----
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Delivery Receipts")
 
     headers = [
         "DR Number", "Client", "Agent",
@@ -1831,7 +1889,7 @@ def dr_table_export(request):
     ]
     ws.append(headers)
 
-    for dr in qs:
+    for dr in qs.iterator(chunk_size=2000):
         ws.append([
             dr.dr_number,
             dr.client.company_name,
@@ -1987,11 +2045,50 @@ def po_filter_suggestions_api(request):
 
     return JsonResponse({"ok": True, "results": results[:25]})
 
+# Archived / cancelled visibility, keyed by (hide_archived, hide_cancelled).
+# Each is one boolean predicate over the two flags; Q() matches everything.
+PO_VISIBILITY_FILTERS = {
+    # SHOW ALL: active + archived + cancelled
+    (True, True): Q(),
+    # Cancelled (which are archived) + all active
+    (False, True): Q(is_cancelled=True) | Q(is_archived=False),
+    # Archived but not cancelled, plus active
+    (True, False): ~Q(is_archived=True, is_cancelled=True),
+    # Default: active only
+    (False, False): Q(is_archived=False, is_cancelled=False),
+}
+
+PO_SORT_OPTIONS = {
+    "date_desc": "-date",
+    "date_asc": "date",
+    "total_desc": "-total",
+    "total_asc": "total",
+    "po_desc": "-po_number",
+    "po_asc": "po_number",
+}
+
+# Static filter choices for the PO table
+PO_STATUSES = [s for s, _ in POStatus.choices]
+PO_APPROVAL_STATUSES = [
+    ("PENDING", "Pending"),
+    ("APPROVED", "Approved"),
+    ("DECLINED", "Declined"),
+]
+
+
 @login_required
 def po_table(request):
     qs = (
         PurchaseOrder.objects
         .select_related("prepared_by")
+        # only the columns the table rows render
+        .only(
+            "id", "po_number", "date", "paid_to", "status", "approval_status",
+            "total", "is_archived", "is_cancelled",
+            "prepared_by__username", "prepared_by__first_name", "prepared_by__last_name",
+        )
+        # the row shows just the Product ID code
+        .annotate(product_code=F("product_id_ref__code"))
     )
 
 
@@ -2061,40 +2158,10 @@ def po_table(request):
 
     if end_date:
         qs = qs.filter(date__lte=end_date)
-    if hide_archived and hide_cancelled:
-        # SHOW ALL: active + archived + cancelled
-        pass
-
-    elif hide_cancelled:
-        # Show cancelled (which are archived) + all active
-        qs = qs.filter(
-            Q(is_cancelled=True) |
-            Q(is_archived=False)
-        )
-
-    elif hide_archived:
-        # Show archived BUT NOT cancelled, plus active
-        qs = qs.filter(
-            Q(is_archived=False) |
-            Q(is_archived=True, is_cancelled=False)
-        )
-
-    else:
-        # Default: show active only
-        qs = qs.filter(
-            is_archived=False,
-            is_cancelled=False
-        )
+    qs = qs.filter(PO_VISIBILITY_FILTERS[hide_archived, hide_cancelled])
 
-    SORT_OPTIONS = {
-        "date_desc": "-date",
-        "date_asc": "date",
-        "total_desc": "-total",
-        "total_asc": "total",
-        "po_desc": "-po_number",
-        "po_asc": "po_number",
-    }
-    qs = qs.order_by(SORT_OPTIONS.get(sort_by, "-date"))
+    sort_field = PO_SORT_OPTIONS.get(sort_by, "-date")
+    qs = qs.order_by(*keyset_order(sort_field))
     # -------------------------------------------------
     # Archived / Cancelled visibility logic
     # -------------------------------------------------
@@ -2104,31 +2171,34 @@ def po_table(request):
     # Pagination (LAST)
     # -------------------
     paginator = Paginator(qs, 100)
-    page_obj = paginator.get_page(request.GET.get("page", 1))
-    paid_to_values = (
-        PurchaseOrder.objects
-        .exclude(paid_to__isnull=True)
-        .exclude(paid_to__exact="")
-        .values_list("paid_to", flat=True)
-        .distinct()
-        .order_by("paid_to")
+    # po_number stays NULL until filing, so only the other sorts can seek
+    seekable = sort_field.lstrip("-") != "po_number"
+    page_obj = seek_page(
+        paginator,
+        request.GET.get("page", 1),
+        request.GET.get("after") if seekable else None,
+        sort_field,
     )
+    next_after = page_obj[len(page_obj) - 1].pk if seekable and page_obj.has_next() else ""
     total_sum = qs.aggregate(total=Sum("total"))["total"] or 0
     # -----------------------------
     # Pagination-safe querystring
     # -----------------------------
     qs = request.GET.copy()
     qs.pop("page", None)
+    qs.pop("after", None)
     base_querystring = qs.urlencode()
 
     return render(request, "bondking_app/po_table.html", {
         "page_obj": page_obj,
-        "users": User.objects.all().order_by("username"),
-        "approval_statuses": [
-            ("PENDING", "Pending"),
-            ("APPROVED", "Approved"),
-            ("DECLINED", "Declined"),
-        ],
+        # Only users who can match the Prepared By filter
+        "users": (
+            User.objects
+            .filter(Exists(PurchaseOrder.objects.filter(prepared_by=OuterRef("pk"))))
+            .only("id", "username", "first_name", "last_name")
+            .order_by("username")
+        ),
+        "approval_statuses": PO_APPROVAL_STATUSES,
         "hide_archived": hide_archived,
         "hide_cancelled": hide_cancelled,
         "sort_by": sort_by,
@@ -2143,12 +2213,12 @@ def po_table(request):
             "q": q,
         },
         "total_sum": total_sum,
-        "paid_to_values": paid_to_values,
         "is_top_management": is_top_management(request.user),
-        "product_ids": ProductID.objects.filter(is_active=True).order_by("code"),
-        "statuses": [s for s, _ in POStatus.choices],
+        "product_ids": get_product_id_choices(),
+        "statuses": PO_STATUSES,
         "product_id": product_id_ids,
         "base_querystring": base_querystring,
+        "next_after": next_after,
     })
 
 
@@ -2159,7 +2229,17 @@ def po_table_export(request):
     import openpyxl
     from django.http import HttpResponse
 
-    qs = PurchaseOrder.objects.select_related("prepared_by")
+    qs = (
+        PurchaseOrder.objects
+        .select_related("prepared_by")
+        # only the columns written to the sheet
+        .only(
+            "id", "po_number", "date", "paid_to", "address", "status",
+            "approval_status", "total", "created_at", "updated_at",
+            "is_archived", "is_cancelled",
+            "prepared_by__username", "prepared_by__first_name", "prepared_by__last_name",
+        )
+    )
 
     # -------------------
     # Excel-safe datetime
@@ -2234,51 +2314,19 @@ def po_table_export(request):
             Q(prepared_by__last_name__icontains=q)
         )
 
-    if hide_archived and hide_cancelled:
-        # SHOW ALL: active + archived + cancelled
-        pass
-
-    elif hide_cancelled:
-        # Show cancelled (which are archived) + all active
-        qs = qs.filter(
-            Q(is_cancelled=True) |
-            Q(is_archived=False)
-        )
-
-    elif hide_archived:
-        # Show archived BUT NOT cancelled, plus active
-        qs = qs.filter(
-            Q(is_archived=False) |
-            Q(is_archived=True, is_cancelled=False)
-        )
-
-    else:
-        # Default: show active only
-        qs = qs.filter(
-            is_archived=False,
-            is_cancelled=False
-        )
+    qs = qs.filter(PO_VISIBILITY_FILTERS[hide_archived, hide_cancelled])
 
 
     # -------------------
     # SORT (MATCH po_table)
     # -------------------
-    SORT_MAP = {
-        "date_desc": "-date",
-        "date_asc": "date",
-        "total_desc": "-total",
-        "total_asc": "total",
-        "po_desc": "-po_number",
-        "po_asc": "po_number",
-    }
-    qs = qs.order_by(SORT_MAP.get(sort_by, "po_number"))
+    qs = qs.order_by(PO_SORT_OPTIONS.get(sort_by, "po_number"))
 
     # -------------------
     # EXCEL OUTPUT
     # -------------------
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Purchase Orders"
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Purchase Orders")
 
     headers = [
         "PO Number",
@@ -2298,7 +2346,7 @@ def po_table_export(request):
     ]
     ws.append(headers)
 
-    for po in qs:
+    for po in qs.iterator(chunk_size=2000):
         ws.append([
             po.po_number,
             po.date,
@@ -2361,50 +2409,247 @@ def cancel_po(request, pk):
     return redirect("po-table")
 
 
-def compute_stock_snapshot():
-    snapshot = []
+# Movement totals change only when issuances or DRs are written; the
+# timeout bounds staleness from bulk update() calls, which skip signals.
+STOCK_TOTALS_TIMEOUT = 300
 
-    for product in Product.objects.all():
-        wh_in = InventoryIssuanceItem.objects.filter(
-            issuance__issuance_type="TF_TO_WH",
-            issuance__is_pending=False,
-            issuance__is_cancelled=False,
-            product=product,
-        ).aggregate(q=Sum("quantity"))["q"] or 0
 
-        wh_out = InventoryIssuanceItem.objects.filter(
-            issuance__issuance_type="WH_TO_HQ",
-            issuance__is_pending=False,
-            issuance__is_cancelled=False,
-            product=product,
-        ).aggregate(q=Sum("quantity"))["q"] or 0
+def compute_stock_totals():
+    """
+    All-time per-product movement totals as {product_id: qty} dicts under
+    "wh_in", "wh_out" and "dr_out", in two grouped queries.
+    """
+    wh_in, wh_out = {}, {}
+    issued = (
+        InventoryIssuanceItem.objects
+        .filter(issuance__is_pending=False, issuance__is_cancelled=False)
+        .values("product_id")
+        .annotate(
+            wh_in=Sum(Case(
+                When(issuance__issuance_type=InventoryIssuance.TF_TO_WH, then="quantity"),
+                default=0,
+                output_field=IntegerField(),
+            )),
+            wh_out=Sum(Case(
+                When(issuance__issuance_type=InventoryIssuance.WH_TO_HQ, then="quantity"),
+                default=0,
+                output_field=IntegerField(),
+            )),
+        )
+        .order_by()
+    )
+    for row in issued:
+        wh_in[row["product_id"]] = row["wh_in"]
+        wh_out[row["product_id"]] = row["wh_out"]
 
-        dr_out = DeliveryReceiptItem.objects.filter(
-            product=product,
-        ).filter(
+    dr_out = dict(
+        DeliveryReceiptItem.objects
+        .filter(
             Q(delivery_receipt__delivery_status="DELIVERED") |
             Q(delivery_receipt__delivery_method=DeliveryMethod.D2D_STOCKS)
-        ).exclude(
-            delivery_receipt__delivery_method=DeliveryMethod.DOOR_TO_DOOR
-        ).exclude(
-            delivery_receipt__is_cancelled=True
-        ).aggregate(q=Sum("quantity"))["q"] or 0
+        )
+        .exclude(delivery_receipt__delivery_method=DeliveryMethod.DOOR_TO_DOOR)
+        .exclude(delivery_receipt__is_cancelled=True)
+        .values("product_id")
+        .annotate(q=Sum("quantity"))
+        .order_by()
+        .values_list("product_id", "q")
+    )
+    return {"wh_in": wh_in, "wh_out": wh_out, "dr_out": dr_out}
+
+
+def stock_totals():
+    """
+    compute_stock_totals(), cached; cleared by any issuance or DR write.
+    """
+    return cache.get_or_set(STOCK_TOTALS_CACHE_KEY, compute_stock_totals, STOCK_TOTALS_TIMEOUT)
+
 
+def compute_stock_snapshot():
+    """
+    Per-product WH / HQ stock rows for the inventory table. The totals come
+    from the cache; only the product names are read on each call.
+    """
+    totals = stock_totals()
+    wh_in, wh_out, dr_out = totals["wh_in"], totals["wh_out"], totals["dr_out"]
 
+    snapshot = []
+    for product in Product.objects.only("id", "name").iterator(chunk_size=500):
         snapshot.append({
             "product": product,
-            "wh_stock": wh_in - wh_out,
-            "hq_stock": wh_out - dr_out,
+            "wh_stock": wh_in.get(product.id, 0) - wh_out.get(product.id, 0),
+            "hq_stock": wh_out.get(product.id, 0) - (dr_out.get(product.id) or 0),
         })
 
     return snapshot
 
+
+def warehouse_stock_map():
+    """
+    {product_id: WH stock} for every product, from the cached totals.
+    """
+    totals = stock_totals()
+    wh_in, wh_out = totals["wh_in"], totals["wh_out"]
+    return {
+        pid: wh_in.get(pid, 0) - wh_out.get(pid, 0)
+        for pid in Product.objects.values_list("id", flat=True).iterator(chunk_size=500)
+    }
+
+
+def current_wh_stock(product_ids):
+    """
+    {product_id: WH stock} for the given products, read fresh. The cached
+    totals can lag writes that skip signals (bulk update()), so checks that
+    gate a write use this instead of warehouse_stock_map().
+    """
+    stock = dict.fromkeys(product_ids, 0)
+    stock.update(
+        InventoryIssuanceItem.objects
+        .filter(
+            product_id__in=product_ids,
+            issuance__is_pending=False,
+            issuance__is_cancelled=False,
+        )
+        .values("product_id")
+        .annotate(wh=Sum(Case(
+            When(issuance__issuance_type=InventoryIssuance.TF_TO_WH, then=F("quantity")),
+            When(issuance__issuance_type=InventoryIssuance.WH_TO_HQ, then=-F("quantity")),
+            default=0,
+            output_field=IntegerField(),
+        )))
+        .order_by()
+        .values_list("product_id", "wh")
+    )
+    return stock
+
+ISSUANCE_TYPE_LABELS = dict(InventoryIssuance.ISSUANCE_TYPE_CHOICES)
+
+# Columns the movement rows are built from; items are read as values() dicts
+ISSUANCE_MOVEMENT_FIELDS = (
+    "id", "product_id", "product__name", "quantity", "issuance_id",
+    "issuance__created_at", "issuance__issuance_type",
+    "issuance__is_pending", "issuance__is_cancelled",
+)
+DR_MOVEMENT_FIELDS = (
+    "id", "product_id", "product__name", "quantity", "delivery_receipt_id",
+    "delivery_receipt__date_of_delivery", "delivery_receipt__dr_number",
+    "delivery_receipt__is_cancelled", "delivery_receipt__client_id",
+    "delivery_receipt__client__company_name",
+)
+
+
+def issuance_movement_row(item):
+    iss_id = item["issuance_id"]
+    issuance_type = item["issuance__issuance_type"]
+    to_wh = issuance_type == InventoryIssuance.TF_TO_WH
+    return {
+        "date": item["issuance__created_at"],
+        "type": issuance_type,
+        "type_label": ISSUANCE_TYPE_LABELS.get(issuance_type, issuance_type),
+        "ref": f"ISS-{iss_id}",
+        "group_key": f"ISS-{iss_id}",
+        "parent_id": iss_id,
+        "parent_type": "ISSUANCE",
+        "product": {"id": item["product_id"], "name": item["product__name"]},
+        "qty": item["quantity"],
+        "from": "TF" if to_wh else "WH",
+        "to": "WH" if to_wh else "HQ",
+        "is_pending": item["issuance__is_pending"],
+        "is_cancelled": item["issuance__is_cancelled"],
+    }
+
+
+def dr_movement_row(item):
+    dr_id = item["delivery_receipt_id"]
+    client_name = item["delivery_receipt__client__company_name"]
+    return {
+        "date": item["delivery_receipt__date_of_delivery"],
+        "type": "DR",
+        "type_label": "Delivery Receipt",
+        "ref": item["delivery_receipt__dr_number"],
+        "group_key": f"DR-{dr_id}",
+        "parent_id": dr_id,
+        "parent_type": "DR",
+        "product": {"id": item["product_id"], "name": item["product__name"]},
+        "qty": item["quantity"],
+        "from": "HQ",
+        "to": client_name,
+        "to_client_id": item["delivery_receipt__client_id"],
+        "to_client_name": client_name,
+        "is_pending": False,
+        "is_cancelled": item["delivery_receipt__is_cancelled"],
+    }
+
+
+def movement_date_order(day, reverse):
+    """
+    ORDER BY for movement days: by day, undated rows count as the earliest.
+    """
+    return day.desc(nulls_last=True) if reverse else day.asc(nulls_first=True)
+
+
+class MovementRows:
+    """
+    Day-ordered movement rows from several sources, one
+    (values() queryset, day expression, to_row) triple per source. The
+    sources are ordered and sliced together in SQL as a UNION ALL of their
+    keys; only the rows of the requested slice are loaded. Same-day rows
+    keep source order, then id order.
+    """
+
+    def __init__(self, sources, reverse=False):
+        self.sources = sources
+        self.reverse = reverse
+
+    def count(self):
+        return sum(qs.count() for qs, _, _ in self.sources)
+
+    def _keys(self):
+        parts = [
+            qs.annotate(source=Value(i), day=day)
+            .values_list("source", "id", "day")
+            .order_by()
+            for i, (qs, day, _) in enumerate(self.sources)
+        ]
+        return parts[0].union(*parts[1:], all=True).order_by(
+            movement_date_order(F("day"), self.reverse), "source", "id"
+        )
+
+    def _rows(self, keys):
+        wanted = {}
+        for source, pk, _ in keys:
+            wanted.setdefault(source, []).append(pk)
+        loaded = {
+            source: {
+                item["id"]: item
+                for item in self.sources[source][0].filter(pk__in=pks)
+            }
+            for source, pks in wanted.items()
+        }
+        return [
+            self.sources[source][2](loaded[source][pk])
+            for source, pk, _ in keys
+        ]
+
+    def __iter__(self):
+        keys = self._keys().iterator(chunk_size=2000)
+        # Batches stay under SQLite's bound-parameter limit for pk__in
+        while batch := list(islice(keys, 500)):
+            yield from self._rows(batch)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._rows(list(self._keys()[index]))
+        return self[index:index + 1][0]
+
+
 @login_required
 def inventory_table(request):
     user = request.user
-    is_top_management = user.groups.filter(name="TopManagement").exists() or user.is_superuser
-    is_logistics = user.groups.filter(name__in=["LogisticsOfficer", "LogisticsHead"]).exists()
-    is_logistics_head = user.groups.filter(name="LogisticsHead").exists()
+    groups = user_group_names(user)
+    is_top_management = "TopManagement" in groups or user.is_superuser
+    is_logistics = not groups.isdisjoint({"LogisticsOfficer", "LogisticsHead"})
+    is_logistics_head = "LogisticsHead" in groups
     can_approve_inventory = is_logistics_head or is_top_management
 
 
@@ -2426,123 +2671,59 @@ def inventory_table(request):
     hide_cancelled = request.GET.get("hide_cancelled") == "1"
 
     # ==========================
-    # UNIFIED MOVEMENT ROWS
-    # ==========================
-    rows = []
-
-    issuance_items = InventoryIssuanceItem.objects.select_related(
-        "issuance", "product"
-    )
-
-    for item in issuance_items:
-        iss = item.issuance
-
-        if hide_cancelled and iss.is_cancelled:
-            continue
-
-
-        if selected_types and iss.issuance_type not in selected_types:
-            continue
-
-        if selected_products and str(item.product.id) not in selected_products:
-            continue
-
-        rows.append({
-            "date": iss.created_at,
-            "type": iss.issuance_type,
-            "type_label": iss.get_issuance_type_display(),
-            "ref": f"ISS-{iss.id}",
-            "group_key": f"ISS-{iss.id}",
-            "parent_id": iss.id,
-            "parent_type": "ISSUANCE",
-            "product": item.product,
-            "qty": item.quantity,
-            "from": "TF" if iss.issuance_type == InventoryIssuance.TF_TO_WH else "WH",
-            "to": "WH" if iss.issuance_type == InventoryIssuance.TF_TO_WH else "HQ",
-            "is_pending": iss.is_pending,
-            "is_cancelled": iss.is_cancelled,
-        })
-
-    dr_items = DeliveryReceiptItem.objects.filter(
-        Q(delivery_receipt__delivery_method=DeliveryMethod.D2D_STOCKS) |
-        Q(delivery_receipt__delivery_status="DELIVERED")
-    ).exclude(
-        delivery_receipt__delivery_method=DeliveryMethod.DOOR_TO_DOOR
-    )
-
-
-    if not hide_cancelled:
-        dr_items = dr_items.filter(delivery_receipt__is_cancelled=True)
-
-
-    for item in dr_items:
-        dr = item.delivery_receipt
-
-        if selected_types and "DR" not in selected_types:
-            continue
-
-        if selected_products and str(item.product.id) not in selected_products:
-            continue
-
-        rows.append({
-            "date": dr.date_of_delivery,
-            "type": "DR",
-            "type_label": "Delivery Receipt",
-            "ref": dr.dr_number,
-            "group_key": f"DR-{dr.id}",
-            "parent_id": dr.id,
-            "parent_type": "DR",
-            "product": item.product,
-            "qty": item.quantity,
-            "from": "HQ",
-            "to": dr.client.company_name,
-            "to_client_id": dr.client.id,
-            "to_client_name": dr.client.company_name,
-            "is_pending": False,
-            "is_cancelled": dr.is_cancelled,
-        })
-
-    # ==========================
-    # DATE FILTER
+    # UNIFIED MOVEMENT ROWS (filtered in SQL)
     # ==========================
+    start = datetime.fromisoformat(start_date).date() if start_date else None
+    end = datetime.fromisoformat(end_date).date() if end_date else None
+    product_ids = clean_int_list(selected_products)
+    reverse = sort_by.endswith("desc")
+    sources = []
 
-    if start_date:
-        start = datetime.fromisoformat(start_date).date()
-        rows = [
-            r for r in rows
-            if r["date"] and r["date"].date() >= start
-        ]
+    issuance_items = InventoryIssuanceItem.objects.values(*ISSUANCE_MOVEMENT_FIELDS)
+    if hide_cancelled:
+        issuance_items = issuance_items.filter(issuance__is_cancelled=False)
+    if selected_types:
+        issuance_items = issuance_items.filter(issuance__issuance_type__in=selected_types)
+    if selected_products:
+        issuance_items = issuance_items.filter(product_id__in=product_ids)
+    # Day bounds as a created_at range, so the column stays index-usable
+    if start:
+        issuance_items = issuance_items.filter(
+            issuance__created_at__gte=timezone.make_aware(datetime.combine(start, datetime.min.time()))
+        )
+    if end:
+        issuance_items = issuance_items.filter(
+            issuance__created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        )
+    sources.append((issuance_items, TruncDate("issuance__created_at"), issuance_movement_row))
 
-    if end_date:
-        end = datetime.fromisoformat(end_date).date()
-        rows = [
-            r for r in rows
-            if r["date"] and r["date"].date() <= end
-        ]
+    if not selected_types or "DR" in selected_types:
+        dr_items = DeliveryReceiptItem.objects.filter(
+            Q(delivery_receipt__delivery_method=DeliveryMethod.D2D_STOCKS) |
+            Q(delivery_receipt__delivery_status="DELIVERED")
+        ).exclude(
+            delivery_receipt__delivery_method=DeliveryMethod.DOOR_TO_DOOR
+        ).values(*DR_MOVEMENT_FIELDS)
 
-    # ==========================
-    # SORTING
-    # ==========================
-    reverse = sort_by.endswith("desc")
-    def normalize_date(d):
-        if d is None:
-            return date.min
-        if isinstance(d, datetime):
-            return d.date()
-        return d  # already a date
-
-    rows.sort(
-        key=lambda r: normalize_date(r["date"]),
-        reverse=reverse
-    )
+        if not hide_cancelled:
+            dr_items = dr_items.filter(delivery_receipt__is_cancelled=True)
+        if selected_products:
+            dr_items = dr_items.filter(product_id__in=product_ids)
+        if start:
+            dr_items = dr_items.filter(delivery_receipt__date_of_delivery__gte=start)
+        if end:
+            dr_items = dr_items.filter(delivery_receipt__date_of_delivery__lte=end)
+        sources.append((dr_items, F("delivery_receipt__date_of_delivery"), dr_movement_row))
 
+    rows = MovementRows(sources, reverse=reverse)
 
     # ==========================
     # EXPORT
     # ==========================
     if "export" in request.GET:
-        wb = Workbook()
-        ws = wb.active
+        # Write-only: rows stream from the querysets straight into the file
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
         ws.append([
             "Date",
             "Movement",
@@ -2564,7 +2745,7 @@ def inventory_table(request):
                 excel_safe_date(r["date"]),
                 r["type_label"],
                 r["ref"],
-                r["product"].name,
+                r["product"]["name"],
                 r["qty"],
                 r["from"],
                 r["to"],
@@ -2581,16 +2762,13 @@ def inventory_table(request):
         response["Content-Disposition"] = "attachment; filename=inventory.xlsx"
         wb.save(response)
         return response
-    nav_ids = [
-        str(r["parent_id"])
-        for r in rows
-        if r.get("parent_type") == "ISSUANCE"
-    ]
-
+    paginator = Paginator(rows, 100)
+    page_obj = paginator.get_page(request.GET.get("page", 1))
 
     return render(request, "bondking_app/inventory_table.html", {
         "snapshot": snapshot,
-        "rows": rows,
+        "rows": page_obj.object_list,
+        "page_obj": page_obj,
         "products": products,
         "selected": {
             "types": selected_types,
@@ -2604,7 +2782,6 @@ def inventory_table(request):
         "is_logistics": is_logistics,
         "can_approve_inventory": can_approve_inventory,
         "can_manage_inventory_issuance": can_manage_inventory_issuance(user),
-        "nav_ids": ",".join(nav_ids),
     })
 @login_required
 def inventory_cancel(request, pk):
@@ -2633,26 +2810,9 @@ def inventory_new(request):
         messages.error(request, "Only AGR is allowed to create inventory issuances.")
         return redirect("inventory-table")  
     # ==========================
-    # WH STOCK MAP (for display)
+    # WH STOCK MAP (for display only; cached)
     # ==========================
-    wh_stock_map = {}
-
-    for product in Product.objects.all():
-        wh_in = InventoryIssuanceItem.objects.filter(
-            issuance__issuance_type=InventoryIssuance.TF_TO_WH,
-            issuance__is_pending=False,
-            issuance__is_cancelled=False,
-            product=product,
-        ).aggregate(q=Sum("quantity"))["q"] or 0
-
-        wh_out = InventoryIssuanceItem.objects.filter(
-            issuance__issuance_type=InventoryIssuance.WH_TO_HQ,
-            issuance__is_pending=False,
-            issuance__is_cancelled=False,
-            product=product,
-        ).aggregate(q=Sum("quantity"))["q"] or 0
-
-        wh_stock_map[product.id] = wh_in - wh_out
+    wh_stock_map = warehouse_stock_map()
 
     if request.method == "POST":
         form = InventoryIssuanceForm(request.POST)
@@ -2661,53 +2821,71 @@ def inventory_new(request):
         if form.is_valid() and formset.is_valid():
             issuance_type = form.cleaned_data["issuance_type"]
 
-            # ==========================
-            # WH AVAILABILITY VALIDATION
-            # ==========================
-            if issuance_type == InventoryIssuance.WH_TO_HQ:
-                for f in formset:
-                    product = f.cleaned_data.get("product")
-                    qty = f.cleaned_data.get("quantity")
-
-                    if not product or not qty:
-                        continue
-
-                    # WH stock computation
-                    wh_in = InventoryIssuanceItem.objects.filter(
-                        issuance__issuance_type=InventoryIssuance.TF_TO_WH,
-                        issuance__is_pending=False,
-                        issuance__is_cancelled=False,
-                        product=product,
-                    ).aggregate(q=Sum("quantity"))["q"] or 0
-
-                    wh_out = InventoryIssuanceItem.objects.filter(
-                        issuance__issuance_type=InventoryIssuance.WH_TO_HQ,
-                        issuance__is_pending=False,
-                        issuance__is_cancelled=False,
-                        product=product,
-                    ).aggregate(q=Sum("quantity"))["q"] or 0
-
-                    available_wh = wh_in - wh_out
-
-                    if qty > available_wh:
-                        messages.error(
-                            request,
-                            f"Not enough WH stock for {product.name}. "
-                            f"Available: {available_wh}, Requested: {qty}"
-                        )
-                        return redirect("inventory-new")
+            # Rows that will be saved (filled in, not marked for deletion)
+            lines = [
+                (f.cleaned_data["product"], f.cleaned_data["quantity"])
+                for f in formset
+                if f.cleaned_data.get("product")
+                and f.cleaned_data.get("quantity")
+                and not f.cleaned_data.get("DELETE")
+            ]
 
             # ==========================
-            # SAVE (ATOMIC)
+            # CHECK WH STOCK + SAVE (ATOMIC)
             # ==========================
-            with transaction.atomic():
-                issuance = form.save(commit=False)
-                issuance.created_by = user
-                issuance.is_pending = False
-                issuance.save()
-
-                formset.instance = issuance
-                formset.save()
+            try:
+                with transaction.atomic():
+                    if issuance_type == InventoryIssuance.WH_TO_HQ:
+                        # Repeated rows of one product draw on the same stock
+                        requested = {}
+                        for product, qty in lines:
+                            requested[product] = requested.get(product, 0) + qty
+                        product_ids = sorted(product.id for product in requested)
+
+                        # Lock the products so concurrent issuances of them
+                        # check and write one after another
+                        list(
+                            Product.objects.select_for_update()
+                            .filter(pk__in=product_ids)
+                            .order_by("pk")
+                            .values_list("pk", flat=True)
+                        )
+                        available = current_wh_stock(product_ids)
+                        for product, qty in requested.items():
+                            available_wh = available[product.id]
+                            if qty > available_wh:
+                                raise ValidationError(
+                                    f"Not enough WH stock for {product.name}. "
+                                    f"Available: {available_wh}, Requested: {qty}"
+                                )
+
+                    issuance = form.save(commit=False)
+                    issuance.created_by = user
+                    issuance.is_pending = False
+                    issuance.save()
+
+                    items = InventoryIssuanceItem.objects.bulk_create(
+                        [
+                            InventoryIssuanceItem(issuance=issuance, product=product, quantity=qty)
+                            for product, qty in lines
+                        ],
+                        batch_size=500,
+                    )
+            except ValidationError as e:
+                messages.error(request, e.message)
+                return redirect("inventory-new")
+
+            # bulk_create skips post_save; send it once committed, so every
+            # InventoryIssuanceItem receiver runs as with formset.save()
+            for item in items:
+                post_save.send(
+                    sender=InventoryIssuanceItem,
+                    instance=item,
+                    created=True,
+                    update_fields=None,
+                    raw=False,
+                    using=item._state.db,
+                )
 
             messages.success(request, "Inventory issuance created successfully.")
             return redirect("inventory-table")
@@ -2734,17 +2912,10 @@ def inventory_edit(request, pk):
 
 
     # reuse the same form & formset logic as inventory_new
-    form = InventoryIssuanceForm(instance=issuance)
-    formset = InventoryIssuanceItemFormSet(
-        request.POST or None,
-        instance=issuance,
-        form_kwargs={"is_locked": is_locked},
-    )
-
     if request.method == "POST" and not is_locked:
         form = InventoryIssuanceForm(request.POST, instance=issuance)
         formset = InventoryIssuanceItemFormSet(
-            request.POST or None,
+            request.POST,
             instance=issuance,
             form_kwargs={"is_locked": is_locked},
         )
@@ -2753,6 +2924,13 @@ def inventory_edit(request, pk):
             form.save()
             formset.save()
             return redirect("inventory-table")
+    else:
+        form = InventoryIssuanceForm(instance=issuance)
+        formset = InventoryIssuanceItemFormSet(
+            request.POST or None,
+            instance=issuance,
+            form_kwargs={"is_locked": is_locked},
+        )
     # =========================
     # NAVIGATION (DR-style)
     # =========================
@@ -2859,23 +3037,21 @@ def product_id_quick_create(request):
 
 
 
-@login_required
-def dr_print(request, pk):
-    dr = get_object_or_404(DeliveryReceipt, pk=pk)
+# Explicit environment detection, read once at import
+IS_RENDER = os.environ.get("RENDER") == "true"
 
-    html = render_to_string(
-        "bondking_app/dr_print.html",
-        {
-            "dr": dr,
-            "client": dr.client,
-            "items": dr.items.select_related("product").all(),
-            "shipping": 0,
-            "other": 0,
-        },
-        request=request,  # ✅ IMPORTANT
-    )
-    # ✅ Explicit environment detection
-    IS_RENDER = os.environ.get("RENDER") == "true"
+
+def html_to_pdf(html):
+    """
+    Render print HTML to PDF bytes. Cached in the on-disk "pdf" cache by a
+    hash of the HTML itself, so any change to the record, its relations or
+    the template yields a new key.
+    """
+    pdf_cache = caches["pdf"]
+    key = "pdf:" + hashlib.blake2b(html.encode(), digest_size=16).hexdigest()
+    pdf = pdf_cache.get(key)
+    if pdf is not None:
+        return pdf
 
     if IS_RENDER:
         # ===== PRODUCTION (Render / Linux) =====
@@ -2883,13 +3059,11 @@ def dr_print(request, pk):
 
         pdf = HTML(
             string=html,
-            base_url=settings.STATIC_ROOT  # 🔑 THIS IS THE FIX
+            base_url=settings.STATIC_ROOT  # 🔑 REQUIRED FOR STATIC FILES
         ).write_pdf()
 
     else:
         # ===== LOCAL (Windows) =====
-        import pdfkit
-
         config = pdfkit.configuration(
             wkhtmltopdf=r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
         )
@@ -2910,13 +3084,35 @@ def dr_print(request, pk):
             }
         )
 
+    pdf_cache.set(key, pdf)
+    return pdf
+
+
+@login_required
+def dr_print(request, pk):
+    dr = get_object_or_404(DeliveryReceipt.objects.select_related("client", "agent"), pk=pk)
+
+    html = render_to_string(
+        "bondking_app/dr_print.html",
+        {
+            "dr": dr,
+            "client": dr.client,
+            "items": dr.items.select_related("product").all(),
+            "shipping": 0,
+            "other": 0,
+        },
+        request=request,  # ✅ IMPORTANT
+    )
+    pdf = html_to_pdf(html)
+
     response = HttpResponse(pdf, content_type="application/pdf")
     response["Content-Disposition"] = f'inline; filename="DR-{dr.dr_number}.pdf"'
     return response
 
 @login_required
 def po_print(request, pk):
-    po = get_object_or_404(PurchaseOrder, pk=pk)
+    po = get_object_or_404(PurchaseOrder.objects.select_related("product_id_ref"), pk=pk)
+    # Evaluated once by the subtotal; the template reuses the cached rows
     items = po.particulars.all()
 
     subtotal = sum(
@@ -2933,39 +3129,7 @@ def po_print(request, pk):
         },
         request=request,
     )
-    # ✅ Explicit environment detection (MATCH dr_print)
-    IS_RENDER = os.environ.get("RENDER") == "true"
-
-    if IS_RENDER:
-        # ===== PRODUCTION (Render / Linux) =====
-        from weasyprint import HTML
-
-        pdf = HTML(
-            string=html,
-            base_url=settings.STATIC_ROOT  # 🔑 REQUIRED FOR STATIC FILES
-        ).write_pdf()
-
-    else:
-        # ===== LOCAL (Windows) =====
-        config = pdfkit.configuration(
-            wkhtmltopdf=r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
-        )
-
-        pdf = pdfkit.from_string(
-            html,
-            False,
-            configuration=config,
-            options={
-                "page-size": "Letter",
-                "orientation": "Portrait",
-                "margin-top": "15mm",
-                "margin-bottom": "15mm",
-                "margin-left": "15mm",
-                "margin-right": "15mm",
-                "encoding": "UTF-8",
-                "--enable-local-file-access": ""
-            }
-        )
+    pdf = html_to_pdf(html)
 
     response = HttpResponse(pdf, content_type="application/pdf")
     response["Content-Disposition"] = f'inline; filename="PO-{po.po_number}.pdf"'
@@ -2983,30 +3147,6 @@ def client_table(request):
     city = request.GET.get("city", "")
 
     sort_by = request.GET.get("sort_by", "company_asc")
-    companies = (
-        Client.objects
-        .exclude(company_name__isnull=True)
-        .exclude(company_name__exact="")
-        .values_list("company_name", flat=True)
-        .distinct()
-        .order_by("company_name")
-    )
-
-    agents = (
-        User.objects
-        .filter(clients__isnull=False)
-        .distinct()
-        .order_by("username")
-    )
-
-    cities = (
-        Client.objects
-        .exclude(city_municipality__isnull=True)
-        .exclude(city_municipality__exact="")
-        .values_list("city_municipality", flat=True)
-        .distinct()
-        .order_by("city_municipality")
-    )
 
     if company:
         qs = qs.filter(company_name__icontains=company)
@@ -3024,27 +3164,26 @@ def client_table(request):
         "created_desc": "-created_at",
         "created_asc": "created_at",
     }
-    qs = qs.order_by(SORT_OPTIONS.get(sort_by, "company_name"))
+    sort_field = SORT_OPTIONS.get(sort_by, "company_name")
+    qs = qs.order_by(*keyset_order(sort_field))
 
     # -------------------
-    # Pagination
+    # Pagination (seeks when the previous page's last row is given)
     # -------------------
     paginator = Paginator(qs, 100)
-    page_obj = paginator.get_page(request.GET.get("page", 1))
+    page_obj = seek_page(paginator, request.GET.get("page", 1), request.GET.get("after"), sort_field)
+    next_after = page_obj[len(page_obj) - 1].pk if page_obj.has_next() else ""
 
     return render(request, "bondking_app/client_table.html", {
         "page_obj": page_obj,
+        "next_after": next_after,
         "sort_by": sort_by,
         "selected": {
             "company": company,
             "agent": agent,
             "city": city,
         },
-        "suggestions": {
-            "companies": companies,
-            "agents": agents,
-            "cities": cities,
-        },
+        "suggestions": get_client_table_suggestions(),
     })
 
 
@@ -3066,6 +3205,22 @@ def client_edit(request, pk):
         "is_create": False,
     })
 
+# Billing status progression and who can advance each step (built once at import)
+_BILLING_ORDER = (
+    BillingStatus.CHECK_CREATION,
+    BillingStatus.CHECK_SIGNING,
+    BillingStatus.PAYMENT_RELEASE,
+    BillingStatus.PAID,
+)
+_EMPTY_FROZEN = frozenset()
+_BILLING_ADVANCE_ALLOWED = {
+    BillingStatus.CHECK_CREATION: frozenset({"RVT", "AccountingOfficer", "AccountingHead"}),
+    BillingStatus.CHECK_SIGNING: frozenset({"AGR"}),
+    BillingStatus.PAYMENT_RELEASE: frozenset({"RVT"}),
+    BillingStatus.PAID: _EMPTY_FROZEN,
+}
+
+
 @require_POST
 @login_required
 def billing_advance(request, pk):
@@ -3087,12 +3242,7 @@ def billing_advance(request, pk):
         billing.proof_of_payment = request.FILES["proof_of_payment"]
         billing.save(update_fields=["proof_of_payment"])
     # Status progression
-    order = [
-        BillingStatus.CHECK_CREATION,
-        BillingStatus.CHECK_SIGNING,
-        BillingStatus.PAYMENT_RELEASE,
-        BillingStatus.PAID,
-    ]
+    order = _BILLING_ORDER
     idx = order.index(billing.status) if billing.status in order else 0
     current = order[idx]
     # =========================
@@ -3111,18 +3261,8 @@ def billing_advance(request, pk):
             )
 
     # Who can advance each step
-    allowed = {
-        BillingStatus.CHECK_CREATION: {"RVT", "AccountingOfficer", "AccountingHead"},
-        BillingStatus.CHECK_SIGNING: {"AGR"},
-        BillingStatus.PAYMENT_RELEASE: {"RVT"},
-        BillingStatus.PAID: set(),
-    }
-
-    if request.user.is_superuser:
-        pass
-    else:
-        if role not in allowed.get(current, set()):
-            return JsonResponse({"ok": False, "error": "You are not allowed to proceed this billing."}, status=403)
+    if not request.user.is_superuser and role not in _BILLING_ADVANCE_ALLOWED.get(current, _EMPTY_FROZEN):
+        return JsonResponse({"ok": False, "error": "You are not allowed to proceed this billing."}, status=403)
 
     if billing.is_cancelled:
         return JsonResponse({"ok": False, "error": "Billing is cancelled."}, status=400)